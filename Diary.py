@@ -1,33 +1,105 @@
+import os
+import time
+# the time the application is started at, the startup profiling mode measures the imports from it
+startup_time = time.perf_counter()
 import flet as ft
-from DiaryRecords import RecordListDB
+from DiaryRecords import RecordListDB, AsyncRecordListDB
 from ViewModel import ViewModel
 from FletCalendar import FletCalendar
 from RecordCreatorView import RecordCreatorView
+imports_time = time.perf_counter()
 
+# the startup profiling mode is turned on by setting the DIARY_PROFILE_STARTUP environment variable to 1,
+# it prints how long the imports, opening the database, creating the views and the first render of the page took
+PROFILE_STARTUP = os.environ.get('DIARY_PROFILE_STARTUP') == '1'
+# the async mode is turned on by setting the DIARY_ASYNC environment variable to 1, the application runs
+# in Flet's async mode and the records are stored in an AsyncRecordListDB, so queries don't block the event loop
+ASYNC_MODE = os.environ.get('DIARY_ASYNC') == '1'
 
-def main(page: ft.Page):
-    # specify the page's design (title, alignment, color scheme)
+
+# create StartupProfile class for measuring the stages of the application startup
+class StartupProfile:
+    def __init__(self, enabled=PROFILE_STARTUP):
+        self.enabled = enabled
+        self.timings = [('imports', imports_time - startup_time)]
+        self.last_time = time.perf_counter()
+
+    def mark(self, stage):
+        """mark() method stores the time passed since the previous stage as the time of the stage"""
+        now = time.perf_counter()
+        self.timings.append((stage, now - self.last_time))
+        self.last_time = now
+
+    def report(self):
+        """report() method prints the times of the stages and the time from the start to the first render"""
+        if not self.enabled:
+            return
+        for stage, seconds in self.timings:
+            print('{0:<16}{1:>10.1f} ms'.format(stage, seconds * 1000))
+        print('{0:<16}{1:>10.1f} ms'.format('time to render', (self.last_time - startup_time) * 1000))
+
+
+def design_page(page: ft.Page):
+    """specify the page's design (title, alignment, color scheme)"""
     page.title = "The diary"
     page.horizontal_alignment = ft.CrossAxisAlignment.CENTER
     page.vertical_alignment = ft.MainAxisAlignment.START
     page.theme_mode = ft.ThemeMode.LIGHT
     page.theme = ft.Theme(color_scheme_seed="#21005D")
+
+
+def main(page: ft.Page):
+    profile = StartupProfile()
+    design_page(page)
     # create class's instances to run app's logic
-    my_calendar = FletCalendar()  # create instance of calendar view
     record_list = RecordListDB('records.db')  # create instance of records storage (Python object or database file)
+    profile.mark('database open')
+    my_calendar = FletCalendar(record_list)  # create instance of calendar view with days colored by mood of entries
     creator = RecordCreatorView(record_list, my_calendar)  # create an interface for creating records in a diary
     # create an interface for displaying list of entries, summary view, and date selection view.
     # ViewModel class's attributes date_selection_view, record_list_view, and summary_view indicate
-    # whether corresponding elements will be added to the page
+    # whether corresponding elements will be added to the page,
+    # records are queried only for the displayed view, when it is added on the page
     model = ViewModel(record_list, date_selection_view=True, record_list_view=True, summary_view=True)
+    profile.mark('views')
 
     # add view elements on the page
     page.add(creator)
     page.add(model)
+    profile.mark('first render')
+    profile.report()
+    # stop the calendar's prefetching and close the database connections of the user session when the session is over
+    def session_closed(e):
+        my_calendar.close()
+        record_list.close()
+    page.on_disconnect = session_closed
+
+
+async def main_async(page: ft.Page):
+    """main_async() function is main() for Flet's async mode, the views have async handlers,
+    which await the queries of the AsyncRecordListDB running on its own thread"""
+    profile = StartupProfile()
+    design_page(page)
+    record_list = await AsyncRecordListDB.open('records.db')
+    profile.mark('database open')
+    my_calendar = FletCalendar(record_list)
+    creator = RecordCreatorView(record_list, my_calendar)
+    model = ViewModel(record_list, date_selection_view=True, record_list_view=True, summary_view=True)
+    profile.mark('views')
+
+    await page.add_async(creator)
+    await page.add_async(model)
+    profile.mark('first render')
+    profile.report()
+
+    async def session_closed(e):
+        my_calendar.close()
+        await record_list.close()
+    page.on_disconnect = session_closed
 
 
 # create a page with specified properties, adds view elements on it
 # and call main() function with a page instance passed into it for creating a user session
 if __name__ == "__main__":
     # run the created page in separate window, starting user session
-    ft.app(target=main)
+    ft.app(target=main_async if ASYNC_MODE else main)
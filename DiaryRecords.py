@@ -1,55 +1,643 @@
+import asyncio
+import queue
+import re
 import sqlite3
-from datetime import datetime
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from heapq import nlargest, nsmallest
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+from math import log
+from datetime import datetime, date as Date
 from statistics import mean
 
+try:
+    # NumPy is optional, it speeds up summaries of ColumnarRecordList, which works without it too
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def symptom_names(symptoms):
+    """symptom_names() function returns the distinct symptoms of the symptoms of an entry joined with commas,
+    every store counts a symptom mentioned twice in an entry once"""
+    if not symptoms:
+        return []
+    return list(dict.fromkeys(symptoms.split(',')))
+
+
+def ranked_counts(counts):
+    """ranked_counts() function returns a dictionary of the counts from the most frequent name,
+    names with the same count are sorted by name, the way the database store orders them"""
+    return dict(sorted(counts.items(), key=lambda item: (-item[1], item[0])))
+
+
+def link_symptoms(db, rows):
+    """link_symptoms() function stores the symptoms of entries in the normalized symptoms and entry_symptoms tables,
+    rows are (rowid, symptoms, day) tuples of the entries, where symptoms are joined with commas"""
+    links = []
+    for rowid, symptoms, day in rows:
+        for name in symptom_names(symptoms):
+            links.append((rowid, day, name))
+    db.executemany('INSERT OR IGNORE INTO symptoms(name) VALUES(?)', ((name,) for rowid, day, name in links))
+    db.executemany('INSERT INTO entry_symptoms(entry_id, symptom_id, day) SELECT ?, id, ? FROM symptoms WHERE name = ?',
+                   links)
+
+
+def link_all_symptoms(db):
+    """link_all_symptoms() function moves symptoms of existing entries to the normalized tables"""
+    link_symptoms(db, db.execute('SELECT rowid, symptoms, day FROM entries').fetchall())
+
+
+def set_all_days(db):
+    """set_all_days() function sets the day of existing entries, parsing their dates with day_number()
+    as the dates of new entries are parsed, e.g. dates without zero padding get their days too"""
+    rows = db.execute('SELECT rowid, date FROM entries').fetchall()
+    db.executemany('UPDATE entries SET day = ? WHERE rowid = ?', ((day_number(date), rowid) for rowid, date in rows))
+
+
+def set_missing_days(db):
+    """set_missing_days() function sets the days of entries, which dates the SQL date functions couldn't parse,
+    when earlier versions added the day column, and the days of their symptoms, then it counts the daily rollups
+    again"""
+    days = [(day_number(date), rowid) for rowid, date in db.execute('SELECT rowid, date FROM entries '
+                                                                     'WHERE day IS NULL').fetchall()]
+    days = [(day, rowid) for day, rowid in days if day is not None]
+    if len(days) == 0:
+        return
+    db.executemany('UPDATE entries SET day = ? WHERE rowid = ?', days)
+    db.executemany('UPDATE entry_symptoms SET day = ? WHERE entry_id = ?', days)
+    db.execute('DELETE FROM daily_rollup')
+    db.execute('DELETE FROM daily_symptom_rollup')
+    for statement in ROLLUP_STATEMENTS:
+        db.execute(statement)
+
+
+# symptoms the catalog of symptoms starts with, users can add their own terms to it
+DEFAULT_SYMPTOMS = ['Headache', 'Abdominal pain', 'Blood in stool', 'Chest pain', 'Constipation', 'Cough', 'Diarrhea',
+                    'Difficulty swallowing', 'Dizziness', 'Eye discomfort and redness', 'Eye problems', 'Foot pain',
+                    'ankle pain', 'Foot swelling', 'leg swelling', 'Heart palpitations', 'Hip pain', 'Knee pain',
+                    'Low back pain', 'Nasal congestion', 'Nausea or vomiting', 'Neck pain', 'Numbness',
+                    'Tingling in hands', 'Pelvic pain', 'Shortness of breath', 'Shoulder pain', 'Sore throat',
+                    'Urinary problems', 'Wheezing', 'Blurred vision', 'Brain fog', 'Choking when eating',
+                    'Crossed eyed', 'Decreased responsiveness', 'Difficult to swallow', 'Difficulty speaking',
+                    'Difficulty walking', 'Difficulty writing', 'Drooling from one side of the mouth',
+                    'Alteration in mental status', 'Drooping eyelids', 'Face or mouth numbness',
+                    'Fine tremors in hands', 'Lost interest in people', 'Limb spasms', 'Limb weakness', 'Seizure',
+                    'Sensitive to sound', 'Sensitive to light', 'Stuttering', 'Tics',
+                    'Trembling of fingers or whole body', 'Hangover', 'Eye twitching', 'Double vision']
+
+
+def seed_symptom_catalog(db):
+    """seed_symptom_catalog() function adds the default symptoms to the catalog of symptoms"""
+    db.executemany('INSERT OR IGNORE INTO symptom_catalog(name) VALUES(?)', ((name,) for name in DEFAULT_SYMPTOMS))
+
+
+# statements counting the daily rollup tables from the entries and their symptoms
+ROLLUP_STATEMENTS = ['INSERT INTO daily_rollup SELECT day, COUNT(*), SUM(mood), MIN(mood), MAX(mood) FROM entries '
+                     'WHERE day IS NOT NULL GROUP BY day',
+                     'INSERT INTO daily_symptom_rollup SELECT day, symptom_id, COUNT(*) FROM entry_symptoms '
+                     'WHERE day IS NOT NULL GROUP BY day, symptom_id']
+
+# schema migrations of the records database, every migration is a list of SQL statements
+# or functions called with the database connection, upgrading the schema
+# from the previous version to the version it is stored under
+MIGRATIONS = {
+    # entries table with title, text, mood, symptoms and date columns
+    1: ['CREATE TABLE IF NOT EXISTS entries(title TEXT, text TEXT, mood INT, symptoms TEXT, date TEXT)'],
+    # the number of the day of the entry date (date.toordinal()), indexed to make date range queries index seeks
+    2: ['ALTER TABLE entries ADD COLUMN day INT',
+        set_all_days,
+        'CREATE INDEX IF NOT EXISTS entries_day ON entries(day)'],
+    # normalized symptoms: every symptom is stored once and linked to the entries mentioning it,
+    # the day of the entry is copied to the links so that symptom queries for a period are index range scans
+    3: ['CREATE TABLE IF NOT EXISTS symptoms(id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)',
+        'CREATE TABLE IF NOT EXISTS entry_symptoms(entry_id INT NOT NULL, symptom_id INT NOT NULL, day INT)',
+        'CREATE INDEX IF NOT EXISTS entry_symptoms_entry ON entry_symptoms(entry_id)',
+        'CREATE INDEX IF NOT EXISTS entry_symptoms_day ON entry_symptoms(day, symptom_id)',
+        'CREATE INDEX IF NOT EXISTS entry_symptoms_symptom ON entry_symptoms(symptom_id, day)',
+        '''CREATE TRIGGER IF NOT EXISTS entries_delete_symptoms AFTER DELETE ON entries BEGIN
+               DELETE FROM entry_symptoms WHERE entry_id = OLD.rowid;
+           END''',
+        link_all_symptoms],
+    # per-day statistics kept current by triggers, so summaries read at most one row per day of the period
+    4: ['CREATE TABLE IF NOT EXISTS daily_rollup(day INTEGER PRIMARY KEY, entries_number INT NOT NULL, '
+        'mood_sum REAL, mood_min REAL, mood_max REAL)',
+        'CREATE TABLE IF NOT EXISTS daily_symptom_rollup(day INT NOT NULL, symptom_id INT NOT NULL, '
+        'number INT NOT NULL, PRIMARY KEY(day, symptom_id))',
+        '''CREATE TRIGGER IF NOT EXISTS entries_insert_rollup AFTER INSERT ON entries WHEN NEW.day IS NOT NULL BEGIN
+               INSERT INTO daily_rollup VALUES(NEW.day, 1, NEW.mood, NEW.mood, NEW.mood)
+               ON CONFLICT(day) DO UPDATE SET entries_number = entries_number + 1,
+                                              mood_sum = mood_sum + excluded.mood_sum,
+                                              mood_min = MIN(mood_min, excluded.mood_min),
+                                              mood_max = MAX(mood_max, excluded.mood_max);
+           END''',
+        # the minimum and the maximum can't be subtracted, so the row of the day is recalculated
+        '''CREATE TRIGGER IF NOT EXISTS entries_delete_rollup AFTER DELETE ON entries WHEN OLD.day IS NOT NULL BEGIN
+               DELETE FROM daily_rollup WHERE day = OLD.day;
+               INSERT INTO daily_rollup
+               SELECT day, COUNT(*), SUM(mood), MIN(mood), MAX(mood) FROM entries WHERE day = OLD.day GROUP BY day;
+           END''',
+        '''CREATE TRIGGER IF NOT EXISTS entry_symptoms_insert_rollup AFTER INSERT ON entry_symptoms
+           WHEN NEW.day IS NOT NULL BEGIN
+               INSERT INTO daily_symptom_rollup VALUES(NEW.day, NEW.symptom_id, 1)
+               ON CONFLICT(day, symptom_id) DO UPDATE SET number = number + 1;
+           END''',
+        '''CREATE TRIGGER IF NOT EXISTS entry_symptoms_delete_rollup AFTER DELETE ON entry_symptoms
+           WHEN OLD.day IS NOT NULL BEGIN
+               UPDATE daily_symptom_rollup SET number = number - 1 WHERE day = OLD.day AND symptom_id = OLD.symptom_id;
+               DELETE FROM daily_symptom_rollup WHERE day = OLD.day AND symptom_id = OLD.symptom_id AND number <= 0;
+           END''',
+        *ROLLUP_STATEMENTS],
+    # full-text index of titles and texts of entries, the FTS5 table reads the text from the entries table
+    # and triggers keep its index in sync with inserted, deleted and updated entries
+    5: ['CREATE VIRTUAL TABLE entries_fts USING fts5(title, text, content=entries)',
+        'CREATE TRIGGER entries_insert_fts AFTER INSERT ON entries BEGIN '
+        'INSERT INTO entries_fts(rowid, title, text) VALUES(new.rowid, new.title, new.text); END',
+        'CREATE TRIGGER entries_delete_fts AFTER DELETE ON entries BEGIN '
+        "INSERT INTO entries_fts(entries_fts, rowid, title, text) VALUES('delete', old.rowid, old.title, old.text); "
+        'END',
+        'CREATE TRIGGER entries_update_fts AFTER UPDATE OF title, text ON entries BEGIN '
+        "INSERT INTO entries_fts(entries_fts, rowid, title, text) VALUES('delete', old.rowid, old.title, old.text); "
+        'INSERT INTO entries_fts(rowid, title, text) VALUES(new.rowid, new.title, new.text); END',
+        "INSERT INTO entries_fts(entries_fts) VALUES('rebuild')"],
+    # catalog of symptoms users can search for and add to entries, user_defined marks the terms added by users
+    6: ['CREATE TABLE symptom_catalog(id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE COLLATE NOCASE, '
+        'user_defined INT NOT NULL DEFAULT 0)',
+        seed_symptom_catalog],
+    # entries with dates like 2023-9-5 got no day from the SQL date functions of migration 2 of earlier versions
+    7: [set_missing_days],
+}
+
+
+# performance profiles of RecordListDB are the pragmas applied to every connection, all of them use WAL journaling,
+# so readers don't wait for the writer, they differ in durability, which synchronous setting gives,
+# and in memory used for the page cache (cache_size in KiB, when negative) and the memory-mapped I/O.
+# 'safe' syncs every commit to disk, so a committed entry survives a power failure, it is the default;
+# 'balanced' syncs at checkpoints only, the last commits can be lost on a power failure or an OS crash
+# (not on a crash of the application), but the database stays consistent;
+# 'fast' doesn't sync at all, a power failure can corrupt the database, it is meant for imports and tests
+PROFILES = {
+    'safe': {'journal_mode': 'wal', 'synchronous': 'FULL', 'cache_size': -2000, 'mmap_size': 0,
+             'temp_store': 'DEFAULT'},
+    'balanced': {'journal_mode': 'wal', 'synchronous': 'NORMAL', 'cache_size': -16000, 'mmap_size': 64 * 2 ** 20,
+                 'temp_store': 'MEMORY'},
+    'fast': {'journal_mode': 'wal', 'synchronous': 'OFF', 'cache_size': -64000, 'mmap_size': 256 * 2 ** 20,
+             'temp_store': 'MEMORY'},
+}
+
+# the largest rowid SQLite can assign, used as the initial cursor of keyset pagination
+MAX_ROWID = 2 ** 63 - 1
+
+
+def day_ordinal(date: str):
+    """day_ordinal() converts a date in YYYY-MM-DD format to the number of the day (date.toordinal()),
+    which is used to compare and index dates"""
+    if len(date) == 10 and date[4] == date[7] == '-':
+        # fromisoformat() is much faster than strptime() for zero-padded dates
+        return Date.fromisoformat(date).toordinal()
+    return datetime.strptime(date, '%Y-%m-%d').toordinal()
+
+
+def day_number(date):
+    """day_number() function returns the number of the day of the date, or None if the date can't be parsed"""
+    try:
+        return day_ordinal(date)
+    except (TypeError, ValueError):
+        return None
+
 
 # create Record class with record's attributes
 class Record:
-    def __init__(self, record_id: int, title: str, text: str, mood: int, symptoms: str, date: str):
+    # slots instead of a per-instance dictionary keep records small in large histories
+    __slots__ = ('title', 'text', 'mood', 'symptoms', 'date', 'day', 'record_id')
+
+    def __init__(self, record_id: int, title: str, text: str, mood: int, symptoms: str, date: str, day=None):
         self.title = title
         self.text = text
         self.mood = mood
         self.symptoms = symptoms
+        # date is kept as YYYY-MM-DD text for displaying, and the number of the day is parsed once
+        # for comparing dates, unless it is passed in by a store that already has it
         self.date = date
+        self.day = day if day is not None else day_number(date)
         self.record_id = record_id
 
 
+def words(text):
+    """words() function returns the lowercase words of the text, the way full-text search splits it"""
+    return re.findall(r'\w+', text.lower()) if text else []
+
+
+def match_query(query):
+    """match_query() function turns a query typed by user into an FTS5 query matching entries,
+    which contain all words of the query, every word is quoted and matches words starting with it"""
+    return ' '.join('"%s"*' % word for word in words(query))
+
+
+def record_factory(cursor, row):
+    """record_factory() function is a row factory creating an instance of Record class
+    from a (rowid, title, text, mood, symptoms, date, day) row"""
+    return Record(*row)
+
+
+# create RecordEvent class describing a change in a record store for subscribers, which asked for events
+class RecordEvent:
+    ADDED = 'added'
+    REMOVED = 'removed'
+    UPDATED = 'updated'
+
+    def __init__(self, kind: str, records: list):
+        # kind is one of ADDED, REMOVED or UPDATED, records are the affected instances of Record class
+        self.kind = kind
+        self.records = records
+
+
+# create FenwickTree class (binary indexed tree) for calculating sums of values in ranges of positions
+class FenwickTree:
+    def __init__(self, size: int):
+        # positions are numbered from 1 to size, nodes of the tree are stored in a dictionary,
+        # so only the nodes covering positions in use take memory
+        self.size = size
+        self.tree = {}
+
+    def add(self, position: int, value):
+        """add() method adds the value to the value at the position in O(log(size))"""
+        while position <= self.size:
+            self.tree[position] = self.tree.get(position, 0) + value
+            position += position & -position
+
+    def prefix_sum(self, position: int):
+        """prefix_sum() method returns the sum of values at positions from 1 to the position in O(log(size))"""
+        total = 0
+        position = min(position, self.size)
+        while position > 0:
+            total += self.tree.get(position, 0)
+            position -= position & -position
+        return total
+
+    def range_sum(self, start: int, end: int):
+        """range_sum() method returns the sum of values at positions from start to end"""
+        return self.prefix_sum(end) - self.prefix_sum(start - 1)
+
+
+# create SymptomCatalog class for finding symptoms by the text typed by user
+class SymptomCatalog:
+    def __init__(self, terms=()):
+        # terms are found by the trigrams of their words: every trigram maps to the ids of the terms containing it,
+        # words of the terms are padded with spaces, so the first letters of words have their own trigrams,
+        # (word, id) pairs are kept sorted to find words starting with the query by binary search
+        self.terms = []
+        self.keys = []
+        self.ids_by_key = {}
+        self.trigrams = {}
+        self.words = []
+        # broad queries, e.g. a single letter, match a large part of a big vocabulary, the matches are ranked
+        # among the first scan_limit terms found in every group, which keeps searching fast at every keystroke
+        self.scan_limit = 200
+        self.add_terms(terms)
+
+    @staticmethod
+    def normalize(text):
+        """normalize() method returns the text in lower case with single spaces between words"""
+        return ' '.join(text.casefold().split())
+
+    @staticmethod
+    def word_trigrams(key):
+        """word_trigrams() method returns the set of trigrams of the padded words of the normalized text"""
+        trigrams = set()
+        for word in key.split():
+            padded = '  %s ' % word
+            trigrams.update(padded[index:index + 3] for index in range(len(padded) - 2))
+        return trigrams
+
+    def __len__(self):
+        return len(self.terms)
+
+    def __contains__(self, term):
+        return self.normalize(term) in self.ids_by_key
+
+    def add_term(self, term):
+        """add_term() method adds the term to the catalog and returns True,
+        or returns False if the term is empty or the catalog has it already in any case"""
+        word_ids = self.store_term(term)
+        for word_id in word_ids:
+            insort(self.words, word_id)
+        return len(word_ids) > 0
+
+    def add_terms(self, terms):
+        """add_terms() method adds many terms, e.g. a vocabulary, sorting the words of the terms once"""
+        for term in terms:
+            self.words.extend(self.store_term(term))
+        self.words.sort()
+
+    def store_term(self, term):
+        """store_term() method stores the term in the lists and the trigram index and returns (word, id) pairs
+        of its words, which must be added to the sorted words, no pairs are returned for a stored term"""
+        key = self.normalize(term)
+        if key == '' or key in self.ids_by_key:
+            return []
+        term_id = len(self.terms)
+        self.terms.append(term.strip())
+        self.keys.append(key)
+        self.ids_by_key[key] = term_id
+        for trigram in self.word_trigrams(key):
+            self.trigrams.setdefault(trigram, []).append(term_id)
+        return [(word, term_id) for word in set(key.split())]
+
+    def search(self, query, limit=10):
+        """search() method returns at most limit terms matching the query in any case, ranked
+        from terms starting with the query, terms with a word starting with it, terms containing it anywhere,
+        to terms similar to it, if nothing matches the query because it is mistyped, shorter terms first in every group"""
+        query = self.normalize(query)
+        if query == '':
+            return []
+        ranks = {}
+        # terms with a word starting with the first word of the query, and the rest of the query after it
+        first_word = query.split()[0]
+        index = bisect_left(self.words, (first_word, -1))
+        while (index < len(self.words) and self.words[index][0].startswith(first_word)
+               and len(ranks) < self.scan_limit):
+            term_id = self.words[index][1]
+            key = self.keys[term_id]
+            if key.startswith(query):
+                ranks[term_id] = (0, 0)
+            elif (' ' + key).find(' ' + query) >= 0:
+                ranks.setdefault(term_id, (1, 0))
+            index += 1
+        if len(query) >= 3 and len(ranks) < self.scan_limit:
+            # terms containing the query inside their words have all trigrams of the query
+            candidates = None
+            for trigram in sorted({query[index:index + 3] for index in range(len(query) - 2)},
+                                  key=lambda trigram: len(self.trigrams.get(trigram, ()))):
+                ids = self.trigrams.get(trigram, ())
+                candidates = set(ids) if candidates is None else candidates.intersection(ids)
+                if not candidates:
+                    break
+            found = 0
+            for term_id in candidates or ():
+                if found == self.scan_limit:
+                    break
+                if term_id not in ranks and query in self.keys[term_id]:
+                    ranks[term_id] = (2, 0)
+                    found += 1
+            if not ranks:
+                self.add_similar_terms(query, ranks)
+        best = nsmallest(limit, ranks, key=lambda term_id: (ranks[term_id], len(self.keys[term_id]),
+                                                           self.keys[term_id]))
+        return [self.terms[term_id] for term_id in best]
+
+    def add_similar_terms(self, query, ranks):
+        """add_similar_terms() method ranks the terms sharing at least half of the trigrams of the query,
+        which finds mistyped terms"""
+        query_trigrams = self.word_trigrams(query)
+        shared = Counter()
+        for trigram in query_trigrams:
+            shared.update(self.trigrams.get(trigram, ()))
+        for term_id, number in shared.items():
+            similarity = number / len(query_trigrams)
+            if similarity >= 0.5 and term_id not in ranks:
+                ranks[term_id] = (3, -similarity)
+
+
+# create Summary class with statistics of records for summary view
+class Summary:
+    def __init__(self, entries_number: int, average_mood, symptoms: dict):
+        self.entries_number = entries_number
+        self.average_mood = average_mood
+        # symptoms and the number of entries they are mentioned in, the most frequent symptoms first
+        self.symptoms = symptoms
+
+
 # create RecordList class for storing records in a Python list object
 class RecordList:
+    # the largest number of records an event of add_records() lists
+    max_event_records = 1000
+
     def __init__(self):
         super().__init__()
-        self.Records = []
-        # implement observer pattern here by creating a list of subscribers
+        # records by their ids in the order they were added, and (day number, id) keys of records sorted by date
+        # to find records between dates by binary search
+        self.records_by_id = {}
+        self.sorted_keys = []
+        self.next_id = 1
+        # number of entries and sum of moods for every day, indexed by the number of the day,
+        # to get statistics of any period without going through the records
+        self.entries_tree = FenwickTree(Date.max.toordinal())
+        self.mood_tree = FenwickTree(Date.max.toordinal())
+        # implement observer pattern here by creating a list of subscribers,
+        # subscribers in the list of event subscribers are called with a RecordEvent describing the change
         self.subscribers = []
+        self.event_subscribers = []
+        # generation is increased on every change of records, so caches of query results know they are outdated
+        self.generation = 0
+        # inverted index for full-text search: every word of titles and texts maps to the (day, id) keys
+        # of the records containing it and the number of times it is found there, words of titles count twice,
+        # indexed words are kept sorted to find words starting with a word of the query by binary search.
+        # The index is built by the first search and then kept up to date, so stores, which are never searched,
+        # e.g. large ColumnarRecordList histories, don't pay for it
+        self.text_index = None
+        self.indexed_words = []
+        self.indexed_number = 0
+        # catalog of symptoms, created on first use
+        self.catalog = None
 
     def add_record(self, title, text, mood: int, symptoms, date):
         """in add_record() method a new instance of the Record class is created
         and added to Python list object for storing"""
-        if len(self.Records) > 0:
-            new_id = max([self.Records[x].record_id for x in range(len(self.Records))]) + 1
+        record = self.store_record(title, text, mood, symptoms, date)
+        self.notify_subscribers(RecordEvent(RecordEvent.ADDED, [record]))
+
+    def add_records(self, records):
+        """add_records() method stores every (title, text, mood, symptoms, date) tuple of the iterable passed into it,
+        which can be a generator, and notifies subscribers once, after all records are added"""
+        added = []
+        number = 0
+        for title, text, mood, symptoms, date in records:
+            record = self.store_record(title, text, mood, symptoms, date)
+            number += 1
+            if number <= self.max_event_records:
+                added.append(record)
+        self.notify_added(added, number)
+
+    def notify_added(self, added, number):
+        """notify_added() method notifies subscribers about the number of added records, the event lists
+        the added records, unless there are more than max_event_records of them, e.g. after an import,
+        then subscribers get no event and refresh their views"""
+        if number == 0:
+            return
+        if number <= self.max_event_records:
+            self.notify_subscribers(RecordEvent(RecordEvent.ADDED, added))
         else:
-            new_id = 1
-        record = Record(new_id, title, text, mood, symptoms, date)
-        self.Records.append(record)
-        self.notify_subscribers()
+            self.notify_subscribers()
+
+    def store_record(self, title, text, mood, symptoms, date):
+        """store_record() method creates a new instance of the Record class and adds it to the Python list object
+        without notifying subscribers"""
+        record = Record(self.next_id, title, text, mood, symptoms, date)
+        self.next_id += 1
+        self.records_by_id[record.record_id] = record
+        if record.day is not None:
+            insort(self.sorted_keys, (record.day, record.record_id))
+            self.count_record(record, 1)
+        self.index_record(record, 1)
+        return record
 
     def remove_record(self, record: Record):
         """remove_record() method is called to remove an instance of the Record class passed into it
-        from the Python list object, and then notify all subscribers in the list of subscribers about it"""
-        self.Records.remove(record)
-        self.notify_subscribers()
+        from the Python list object, and then notify all subscribers in the list of subscribers about it,
+        nothing happens if the record isn't in the list. The record is found by its id,
+        the indexes are updated with the stored record, so a stale copy of the record removes the right one"""
+        stored = self.records_by_id.pop(record.record_id, None)
+        if stored is None:
+            return
+        if stored.day is not None:
+            index = bisect_left(self.sorted_keys, (stored.day, stored.record_id))
+            del self.sorted_keys[index]
+            self.count_record(stored, -1)
+        self.index_record(stored, -1)
+        self.notify_subscribers(RecordEvent(RecordEvent.REMOVED, [stored]))
+
+    def count_record(self, record: Record, sign: int):
+        """count_record() method adds (sign is 1) or subtracts (sign is -1) the record
+        to the number of entries and the sum of moods of its day"""
+        self.entries_tree.add(record.day, sign)
+        self.mood_tree.add(record.day, sign * self.mood_number(record.mood))
+
+    def index_record(self, record: Record, sign: int):
+        """index_record() method adds (sign is 1) or removes (sign is -1) the words of the record
+        to the inverted index of full-text search, if the index has been built"""
+        if self.text_index is None:
+            return
+        if sign > 0:
+            for word in self.add_postings(record):
+                insort(self.indexed_words, word)
+            return
+        key = (record.day or 0, record.record_id)
+        self.indexed_number -= 1
+        for word in set(words(record.title) + words(record.text)):
+            postings = self.text_index.get(word)
+            if postings is not None:
+                postings.pop(key, None)
+                if len(postings) == 0:
+                    del self.text_index[word]
+                    del self.indexed_words[bisect_left(self.indexed_words, word)]
+
+    def add_postings(self, record: Record):
+        """add_postings() method adds the words of the record to the inverted index and returns the new words"""
+        key = (record.day or 0, record.record_id)
+        new_words = []
+        self.indexed_number += 1
+        for word, number in Counter(words(record.title) * 2 + words(record.text)).items():
+            postings = self.text_index.get(word)
+            if postings is None:
+                postings = self.text_index[word] = {}
+                new_words.append(word)
+            postings[key] = number
+        return new_words
 
-    def add_subscriber(self, callback):
+    def build_text_index(self):
+        """build_text_index() method builds the inverted index of all records, sorting the words once"""
+        self.text_index = {}
+        self.indexed_number = 0
+        for record in self.get_records():
+            self.add_postings(record)
+        self.indexed_words = sorted(self.text_index)
+
+    def record_by_key(self, key):
+        """record_by_key() method returns the record with the (day, id) key"""
+        return self.records_by_id[key[1]]
+
+    def search(self, query, start_date=None, end_date=None, limit=50):
+        """search() method returns at most limit records between dates (or of all records, if dates aren't specified)
+        containing all words of the query, or words starting with them, the most relevant records first.
+        Records are ranked by the occurrences of the words weighted by their rarity, like the ranking of FTS5"""
+        if self.text_index is None:
+            self.build_text_index()
+        scores = None
+        for term in words(query):
+            term_scores = {}
+            index = bisect_left(self.indexed_words, term)
+            while index < len(self.indexed_words) and self.indexed_words[index].startswith(term):
+                postings = self.text_index[self.indexed_words[index]]
+                weight = log(1 + self.indexed_number / len(postings))
+                for key, number in postings.items():
+                    term_scores[key] = term_scores.get(key, 0) + number * weight
+                index += 1
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {key: score + term_scores[key] for key, score in scores.items() if key in term_scores}
+            if len(scores) == 0:
+                return []
+        if scores is None:
+            return []
+        if start_date is not None and end_date is not None:
+            start_day, end_day = day_ordinal(start_date), day_ordinal(end_date)
+            scores = {key: score for key, score in scores.items() if start_day <= key[0] <= end_day}
+        # records with the same score are ordered from the newest one
+        best = nlargest(limit, scores.items(), key=lambda item: (item[1], item[0]))
+        return [self.record_by_key(key) for key, score in best]
+
+    def symptom_catalog(self):
+        """symptom_catalog() method returns the SymptomCatalog of the default symptoms and the terms added by user"""
+        if self.catalog is None:
+            self.catalog = SymptomCatalog(DEFAULT_SYMPTOMS)
+        return self.catalog
+
+    def search_symptoms(self, query, limit=10):
+        """search_symptoms() method returns at most limit symptoms of the catalog matching the query"""
+        return self.symptom_catalog().search(query, limit)
+
+    def add_symptom_terms(self, terms):
+        """add_symptom_terms() method adds the terms to the catalog of symptoms"""
+        terms = list(terms)
+        catalog = self.symptom_catalog()
+        if len(terms) == 1:
+            catalog.add_term(terms[0])
+        else:
+            catalog.add_terms(terms)
+
+    @staticmethod
+    def mood_number(mood):
+        """mood_number() method returns the mood level as a number, 0 if it isn't a number"""
+        try:
+            return float(mood)
+        except (TypeError, ValueError):
+            return 0
+
+    def add_subscriber(self, callback, events=False):
+        """add_subscriber() method adds the callback to the list of subscribers, if events is True,
+        the callback is called with a RecordEvent argument, otherwise it is called without arguments"""
         self.subscribers.append(callback)
+        if events:
+            self.event_subscribers.append(callback)
 
     def remove_subscriber(self, callback):
         self.subscribers.remove(callback)
+        if callback in self.event_subscribers:
+            self.event_subscribers.remove(callback)
+
+    def notify_subscribers(self, event=None):
+        """notify_subscribers() method is called by add_record() and remove_record() methods
+        and notify all subscribers in the list of subscribers about the change,
+        event subscribers get the RecordEvent, or None if the change is unknown"""
+        self.generation += 1
+        for callback in list(self.subscribers):
+            if callback in self.event_subscribers:
+                callback(event)
+            else:
+                callback()
 
-    def notify_subscribers(self):
-        """notify_subscribers() method is called by remove_record() method
-        and notify all subscribers in the list of subscribers about deleting a record"""
-        for callback in self.subscribers:
-            callback()
+    @property
+    def Records(self):
+        """list of all records in the order they were added"""
+        return list(self.records_by_id.values())
 
     def get_records(self):
         """get_records() return all records, stored in the Python list object"""
@@ -58,97 +646,906 @@ class RecordList:
     def get_records_between_dates(self, start_date, end_date):
         """get_records_between_dates() method returns a list of records,
         where every record date is between dates, that user specified
-        in date selection view"""
-        records = []
-        start_date_obj = datetime.strptime(start_date, '%Y-%m-%d')
-        end_date_obj = datetime.strptime(end_date, '%Y-%m-%d')
-        for record in self.Records:
-            record_date_obj = datetime.strptime(record.date, '%Y-%m-%d')
-            if (start_date_obj <= record_date_obj) and (record_date_obj <= end_date_obj):
-                records.append(record)
-        return records
+        in date selection view, sorted by date"""
+        start, end = self.sorted_range(day_ordinal(start_date), day_ordinal(end_date))
+        return [self.records_by_id[record_id] for day, record_id in self.sorted_keys[start:end]]
+
+    def sorted_range(self, start_day, end_day):
+        """sorted_range() method returns the slice of sorted keys of records between days found by binary search"""
+        start = bisect_left(self.sorted_keys, (start_day, 0))
+        end = bisect_right(self.sorted_keys, (end_day, MAX_ROWID))
+        return start, end
+
+    def count_between_dates(self, start_date=None, end_date=None):
+        """count_between_dates() method returns the number of records between dates
+        (or of all records, if dates aren't specified) in O(log n)"""
+        start_day, end_day = self.days_between_dates(start_date, end_date)
+        return self.entries_tree.range_sum(start_day, end_day)
+
+    def average_mood_between_dates(self, start_date=None, end_date=None):
+        """average_mood_between_dates() method returns the average mood level of records between dates
+        (or of all records, if dates aren't specified) in O(log n), 0 if there are no records"""
+        start_day, end_day = self.days_between_dates(start_date, end_date)
+        entries_number = self.entries_tree.range_sum(start_day, end_day)
+        if entries_number > 0:
+            return round(self.mood_tree.range_sum(start_day, end_day) / entries_number, 1)
+        return 0
+
+    def get_daily_statistics(self, start_date, end_date):
+        """get_daily_statistics() method returns a list of (date, entries number, average mood, minimal mood,
+        maximal mood) tuples for every day between dates having entries"""
+        moods_by_day = {}
+        for record in self.get_records_between_dates(start_date, end_date):
+            moods_by_day.setdefault(record.day, []).append(self.mood_number(record.mood))
+        return [(Date.fromordinal(day).isoformat(), len(moods), round(sum(moods) / len(moods), 1),
+                 min(moods), max(moods)) for day, moods in moods_by_day.items()]
+
+    @staticmethod
+    def days_between_dates(start_date, end_date):
+        """days_between_dates() method returns numbers of the days of dates,
+        or the numbers of the first and the last days of the calendar, if dates aren't specified"""
+        if start_date is None or end_date is None:
+            return Date.min.toordinal(), Date.max.toordinal()
+        return day_ordinal(start_date), day_ordinal(end_date)
+
+    def summarize(self, start_date=None, end_date=None):
+        """summarize() method returns the Summary of records between dates,
+        or of all records, if dates aren't specified"""
+        return Summary(self.count_between_dates(start_date, end_date),
+                       self.average_mood_between_dates(start_date, end_date),
+                       self.symptom_counts(start_date, end_date))
+
+    def symptom_counts(self, start_date=None, end_date=None):
+        """symptom_counts() method returns a dictionary of symptoms and the number of entries between dates
+        (or of all entries, if dates aren't specified) mentioning them, the most frequent symptoms first"""
+        if start_date is None or end_date is None:
+            records = self.get_records()
+        else:
+            records = self.get_records_between_dates(start_date, end_date)
+        symptoms = Counter()
+        for record in records:
+            symptoms.update(symptom_names(record.symptoms))
+        return ranked_counts(symptoms)
+
+    def get_records_with_symptom(self, symptom, start_date=None, end_date=None):
+        """get_records_with_symptom() method returns a list of records between dates
+        (or of all records, if dates aren't specified) mentioning the symptom"""
+        if start_date is None or end_date is None:
+            records = self.get_records()
+        else:
+            records = self.get_records_between_dates(start_date, end_date)
+        return [record for record in records if symptom in record.symptoms.split(',')]
+
+    def iter_records(self, start_date=None, end_date=None, page_size=50, after=None):
+        """iter_records() method yields records between dates (or all records, if dates aren't specified)
+        from the newest date to the oldest one, and continues after the record passed as after, if it is specified,
+        the same way the database store pages its rows"""
+        start_day, end_day = self.days_between_dates(start_date, end_date)
+        cursor = (end_day, MAX_ROWID)
+        if after is not None:
+            cursor = min(cursor, (after.day, after.record_id))
+        while True:
+            # every page continues before the key of the last yielded record,
+            # so records added or removed while iterating don't shift the pages
+            end = bisect_left(self.sorted_keys, cursor)
+            start = max(bisect_left(self.sorted_keys, (start_day, 0)), end - page_size)
+            page = self.sorted_keys[start:end]
+            for day, record_id in reversed(page):
+                record = self.records_by_id.get(record_id)
+                if record is not None:
+                    yield record
+            if len(page) < page_size:
+                break
+            cursor = page[0]
 
 
 # create RecordList class for storing records in a database file
 class RecordListDB(RecordList):
-    def __init__(self, database_path: str):
+    def __init__(self, database_path: str, profile='safe', write_behind=False, batch_size=100, flush_interval=0.05,
+                 pool_size=4):
         super().__init__()
+        # the profile trades durability of commits for speed, see PROFILES, subscribers are notified after a commit,
+        # which is on disk only with the 'safe' profile
+        if profile not in PROFILES:
+            raise ValueError('Unknown profile %r, expected one of %s' % (profile, ', '.join(PROFILES)))
+        self.profile = profile
         # a database file path must be specified when creating an instance of the class RecordListDB
         # to create a database file in the current directory, if it doesn't exist,
         # and to be able to connect to the database
         self.database_path = database_path
-        # create a new database, if it doesn't exist, and open a database connection
-        db = sqlite3.connect(self.database_path)
-        # create a database cursor to be able to execute SQL statements and fetch results from SQL queries
-        cur = db.cursor()
-        # create database table with title, text, mood, symptoms and date columns
-        cur.execute('CREATE TABLE IF NOT EXISTS entries(title TEXT, text TEXT, mood INT, symptoms TEXT, date TEXT)')
-        # implement observer pattern here by creating a list of subscribers
-        db.commit()
-        db.close()
-        self.subscribers = []
+        # number of new rows, which symptoms are linked at once by add_records()
+        self.link_chunk_size = 1000
+        # queries check long-lived connections out of a pool of at most pool_size connections,
+        # which are opened on first use and kept open until close() is called, so queries don't pay for connecting
+        # and warming up the cache every time, no matter how many threads use the store.
+        # An in-memory database is private to its connection, so it has a single connection used by one thread
+        # at a time
+        if database_path == ':memory:':
+            pool_size = 1
+        self.pool_size = pool_size
+        self.pool_slots = threading.BoundedSemaphore(pool_size)
+        self.idle_connections = []
+        self.connections = []
+        self.connections_lock = threading.Lock()
+        # the connection checked out by the thread, nested with blocks of the thread get the same connection
+        self.local = threading.local()
+        self.closed = False
+        # create the database tables or upgrade the schema of an existing database file
+        self.migrate()
+        # in the write-behind mode add_record() only puts the record into the queue, the writer thread
+        # writes the queued records in batches of at most batch_size records, waiting at most flush_interval seconds
+        # for a batch to fill, with a single commit per batch, subscribers are notified after the commit
+        self.write_behind = write_behind
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.write_queue = None
+        self.writer = None
+        self.write_error = None
+        self.stopping = False
+        if write_behind:
+            self.write_queue = queue.Queue()
+            self.writer = threading.Thread(target=self.write_pending, name='RecordListDB writer', daemon=True)
+            self.writer.start()
+        # the catalog of symptoms is read on the catalog thread as soon as the store is opened,
+        # so the first search of symptoms doesn't wait for a large vocabulary to be loaded
+        self.catalog_lock = threading.Lock()
+        self.catalog_loader = threading.Thread(target=self.load_symptom_catalog, name='RecordListDB catalog',
+                                               daemon=True)
+        self.catalog_loader.start()
+
+    @contextmanager
+    def connection(self):
+        """connection() method checks a database connection out of the pool for the with block and returns it
+        into the pool after the block, waiting for a connection, if all of them are checked out,
+        a thread, which has checked out a connection already, gets the same one"""
+        db = getattr(self.local, 'db', None)
+        if db is not None:
+            yield db
+            return
+        self.pool_slots.acquire()
+        try:
+            db = self.checkout()
+            self.local.db = db
+            try:
+                yield db
+            finally:
+                self.local.db = None
+                with self.connections_lock:
+                    self.idle_connections.append(db)
+        finally:
+            self.pool_slots.release()
+
+    def checkout(self):
+        """checkout() method returns an idle connection of the pool, or opens a new one, if there isn't any"""
+        with self.connections_lock:
+            if self.closed:
+                raise sqlite3.ProgrammingError('Cannot operate on a closed RecordListDB')
+            if self.idle_connections:
+                return self.idle_connections.pop()
+        # connections are used by one thread at a time, but by different threads,
+        # so check_same_thread is disabled
+        db = sqlite3.connect(self.database_path, check_same_thread=False)
+        for pragma, value in PROFILES[self.profile].items():
+            db.execute('PRAGMA %s = %s' % (pragma, value))
+        with self.connections_lock:
+            self.connections.append(db)
+        return db
+
+    def settings(self):
+        """settings() method returns the pragmas of the profile, as they are reported by a connection of the pool,
+        e.g. an in-memory database keeps the memory journal mode"""
+        with self.connection() as db:
+            return {pragma: db.execute('PRAGMA %s' % pragma).fetchone()[0] for pragma in PROFILES[self.profile]}
+
+    def schema_version(self):
+        """schema_version() method returns the version of the database schema, 0 for a new database"""
+        with self.connection() as db:
+            row = db.execute('SELECT MAX(version) FROM schema_version').fetchone()
+        return row[0] or 0
+
+    def migrate(self):
+        """migrate() method applies the migrations the database file hasn't got yet,
+        each one in its own transaction, and stores the new schema version"""
+        with self.connection() as db:
+            db.execute('CREATE TABLE IF NOT EXISTS schema_version(version INT)')
+            version = self.schema_version()
+            for number in sorted(MIGRATIONS):
+                if number <= version:
+                    continue
+                with db:
+                    db.execute('BEGIN')
+                    for statement in MIGRATIONS[number]:
+                        if callable(statement):
+                            statement(db)
+                        else:
+                            db.execute(statement)
+                    db.execute('DELETE FROM schema_version')
+                    db.execute('INSERT INTO schema_version VALUES(?)', (number,))
+
+    def write_pending(self):
+        """write_pending() method runs on the writer thread, it takes the queued records in batches
+        and writes every batch in one transaction, a threading.Event in the queue is set,
+        when the records queued before it are written, None stops the writer"""
+        while True:
+            item = self.write_queue.get()
+            batch = []
+            waiters = []
+            deadline = time.monotonic() + self.flush_interval
+            while item is not None:
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    break
+                batch.append(item)
+                timeout = deadline - time.monotonic()
+                if len(batch) >= self.batch_size or timeout <= 0:
+                    break
+                try:
+                    item = self.write_queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+            if batch:
+                try:
+                    self.insert_records(batch)
+                except Exception as error:
+                    self.write_error = error
+            for waiter in waiters:
+                waiter.set()
+            if item is None:
+                return
+
+    def flush(self):
+        """flush() method waits until the records queued in the write-behind mode are committed,
+        and raises the error of a failed batch, if there was one"""
+        if self.writer is not None:
+            if not self.writer.is_alive():
+                raise sqlite3.ProgrammingError('Cannot operate on a closed RecordListDB')
+            written = threading.Event()
+            self.write_queue.put(written)
+            written.wait()
+        error, self.write_error = self.write_error, None
+        if error is not None:
+            raise error
+
+    def close(self):
+        """close() method writes the records queued in the write-behind mode
+        and closes all connections opened by the instance of RecordListDB class,
+        then it raises the error of a failed batch, if there was one, so lost records don't go unnoticed"""
+        self.catalog_loader.join()
+        if self.writer is not None and self.writer.is_alive():
+            self.stopping = True
+            self.write_queue.put(None)
+            self.writer.join()
+        with self.connections_lock:
+            self.closed = True
+        # the connections are closed, when the queries running on them are finished
+        for _ in range(self.pool_size):
+            self.pool_slots.acquire()
+        with self.connections_lock:
+            connections = self.connections
+            self.connections = []
+            self.idle_connections = []
+        for db in connections:
+            db.close()
+        for _ in range(self.pool_size):
+            self.pool_slots.release()
+        error, self.write_error = self.write_error, None
+        if error is not None:
+            raise error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     def add_record(self, title, text, mood, symptoms, date):
-        """add_record() method connects to the database and inserts new row into it,
+        """add_record() method inserts new row into the database,
         using user input passed into the method, and then notifies all subscribers in the list of subscribers,
         that list of records is changed"""
-        db = sqlite3.connect(self.database_path)
-        cur = db.cursor()
-        cur.execute('INSERT INTO entries VALUES(?, ?, ?, ?, ?)', (title, text, mood, symptoms, date))
-        db.commit()
-        db.close()
-        self.notify_subscribers()
+        if self.write_behind:
+            if self.closed or self.stopping:
+                raise sqlite3.ProgrammingError('Cannot operate on a closed RecordListDB')
+            self.write_queue.put((title, text, mood, symptoms, date))
+            return
+        day = day_number(date)
+        with self.connection() as db, db:
+            cur = db.execute('INSERT INTO entries(title, text, mood, symptoms, date, day) VALUES(?, ?, ?, ?, ?, ?)',
+                             (title, text, mood, symptoms, date, day))
+            link_symptoms(db, [(cur.lastrowid, symptoms, day)])
+        record = Record(cur.lastrowid, title, text, mood, symptoms, date, day)
+        self.notify_subscribers(RecordEvent(RecordEvent.ADDED, [record]))
+
+    def add_records(self, records):
+        """add_records() method inserts every (title, text, mood, symptoms, date) tuple of the iterable passed into it
+        with a single executemany() in one transaction, so a generator is streamed into the database
+        without building a list, and then notifies subscribers once"""
+        if self.write_behind:
+            # records queued before are written first, so the records keep the order they were added in
+            self.flush()
+        self.insert_records(records)
+
+    def insert_records(self, records):
+        """insert_records() method writes the records in one transaction and notifies subscribers after the commit"""
+        rows = ((title, text, mood, symptoms, date, day_number(date))
+                for title, text, mood, symptoms, date in records)
+        with self.connection() as db, db:
+            # the rowids of the new rows are greater than the largest rowid before the insert,
+            # the immediate transaction keeps other connections from writing in between
+            db.execute('BEGIN IMMEDIATE')
+            last_rowid = db.execute('SELECT IFNULL(MAX(rowid), 0) FROM entries').fetchone()[0]
+            db.executemany('INSERT INTO entries(title, text, mood, symptoms, date, day) '
+                           'VALUES(?, ?, ?, ?, ?, ?)', rows)
+            # symptoms of the new rows are linked a chunk of rows at a time, reading only their symptoms,
+            # so a streamed import doesn't hold all of its rows in memory
+            number = 0
+            rowid = last_rowid
+            while True:
+                chunk = db.execute('SELECT rowid, symptoms, day FROM entries WHERE rowid > ? ORDER BY rowid LIMIT ?',
+                                   (rowid, self.link_chunk_size)).fetchall()
+                if len(chunk) == 0:
+                    break
+                link_symptoms(db, chunk)
+                number += len(chunk)
+                rowid = chunk[-1][0]
+            added = []
+            if 0 < number <= self.max_event_records:
+                added = self.select_records('SELECT rowid, title, text, mood, symptoms, date, day FROM entries '
+                                            'WHERE rowid > ?', (last_rowid,))
+        self.notify_added(added, number)
 
     def remove_record(self, record: Record):
         """remove_record() method gets an id of the instance of Record class, passed into it,
         and deletes corresponding row in the database table,
         and then notifies all subscribers in the list of subscribers, that list of records is changed"""
-        db = sqlite3.connect(self.database_path)
-        cur = db.cursor()
-        cur.execute('DELETE FROM entries WHERE rowid = ?', (record.record_id,))
-        db.commit()
-        db.close()
-        self.notify_subscribers()
-
-    def add_subscriber(self, callback):
-        self.subscribers.append(callback)
+        with self.connection() as db, db:
+            cur = db.execute('DELETE FROM entries WHERE rowid = ?', (record.record_id,))
+        if cur.rowcount > 0:
+            self.notify_subscribers(RecordEvent(RecordEvent.REMOVED, [record]))
 
     def remove_subscriber(self, callback):
         if callback in self.subscribers:
-            self.subscribers.remove(callback)
-
-    def notify_subscribers(self):
-        """notify_subscribers() notifies all subscribers in the list of subscribers, when specific event is happened"""
-        for callback in self.subscribers:
-            callback()
+            super().remove_subscriber(callback)
 
     def get_records(self):
-        """get_records() method connects to the database, gets all data from it,
+        """get_records() method gets all data from the database,
         creates instances of Record class using the data from database,
         and return list of these instances"""
-        records = []
-        db = sqlite3.connect(self.database_path)
-        cur = db.cursor()
-        res = cur.execute('SELECT rowid, * FROM entries')
-        for row in res:
-            record = Record(row[0], row[1], row[2], row[3], row[4], row[5])
-            records.append(record)
-        db.close()
-        return records
+        return self.select_records('SELECT rowid, title, text, mood, symptoms, date, day FROM entries')
+
+    def select_records(self, query, parameters=()):
+        """select_records() method runs a query selecting (rowid, title, text, mood, symptoms, date, day) rows
+        and returns a list of instances of Record class, created by the row factory with the day read from the row"""
+        with self.connection() as db:
+            cur = db.cursor()
+            cur.row_factory = record_factory
+            return cur.execute(query, parameters).fetchall()
 
     def get_records_between_dates(self, start_date, end_date):
         """get_records_between_dates() method returns a list of records,
         where every record date is between dates, that user specified
         in date selection view"""
-        records = []
-        db = sqlite3.connect(self.database_path)
-        cur = db.cursor()
-        for row in cur.execute('SELECT rowid, * FROM entries WHERE date >= "%s" AND date <= "%s"'
-                               % (start_date, end_date)):
-            record = Record(row[0], row[1], row[2], row[3], row[4], row[5])
-            records.append(record)
-        db.close()
-        return records
+        return self.select_records('SELECT rowid, title, text, mood, symptoms, date, day FROM entries '
+                                   'WHERE day BETWEEN ? AND ? ORDER BY day, rowid',
+                                   (day_ordinal(start_date), day_ordinal(end_date)))
+
+    def summarize(self, start_date=None, end_date=None):
+        """summarize() method returns the Summary of records between dates, or of all records,
+        if dates aren't specified. The statistics are read from the daily rollup tables,
+        so a summary costs at most one row per day of the period, no instances of Record class are created"""
+        entries_number, average_mood = self.summarize_days(start_date, end_date)
+        return Summary(entries_number, average_mood, self.symptom_counts(start_date, end_date))
+
+    def count_between_dates(self, start_date=None, end_date=None):
+        """count_between_dates() method returns the number of records between dates
+        (or of all records, if dates aren't specified) from the daily rollup table"""
+        return self.summarize_days(start_date, end_date)[0]
+
+    def average_mood_between_dates(self, start_date=None, end_date=None):
+        """average_mood_between_dates() method returns the average mood level of records between dates
+        (or of all records, if dates aren't specified) from the daily rollup table, 0 if there are no records"""
+        return self.summarize_days(start_date, end_date)[1]
+
+    def summarize_days(self, start_date, end_date):
+        """summarize_days() method returns the number of entries and the average mood level between dates
+        from the daily rollup table"""
+        condition, parameters = self.days_condition(start_date, end_date)
+        with self.connection() as db:
+            entries_number, mood_sum = db.execute('SELECT IFNULL(SUM(entries_number), 0), SUM(mood_sum) '
+                                                  'FROM daily_rollup ' + condition, parameters).fetchone()
+        if entries_number > 0 and mood_sum is not None:
+            return entries_number, round(mood_sum / entries_number, 1)
+        return entries_number, 0
+
+    def symptom_counts(self, start_date=None, end_date=None):
+        """symptom_counts() method returns a dictionary of symptoms and the number of entries between dates
+        (or of all entries, if dates aren't specified) mentioning them, the most frequent symptoms first"""
+        condition, parameters = self.days_condition(start_date, end_date)
+        with self.connection() as db:
+            rows = db.execute('SELECT s.name, SUM(r.number) AS number FROM daily_symptom_rollup r '
+                              'JOIN symptoms s ON s.id = r.symptom_id ' + condition +
+                              ' GROUP BY r.symptom_id ORDER BY number DESC, s.name', parameters).fetchall()
+        return dict(rows)
+
+    def get_daily_statistics(self, start_date, end_date):
+        """get_daily_statistics() method returns a list of (date, entries number, average mood, minimal mood,
+        maximal mood) tuples for every day between dates having entries"""
+        statistics = []
+        with self.connection() as db:
+            rows = db.execute('SELECT day, entries_number, mood_sum, mood_min, mood_max '
+                              'FROM daily_rollup WHERE day BETWEEN ? AND ? ORDER BY day',
+                              (day_ordinal(start_date), day_ordinal(end_date))).fetchall()
+        for row in rows:
+            average_mood = round(row[2] / row[1], 1) if row[2] is not None else 0
+            statistics.append((Date.fromordinal(row[0]).isoformat(), row[1], average_mood, row[3], row[4]))
+        return statistics
+
+    @staticmethod
+    def days_condition(start_date, end_date):
+        """days_condition() method returns the WHERE clause and its parameters
+        filtering rows of a table with the day column between dates, if they are specified"""
+        if start_date is None or end_date is None:
+            return '', ()
+        return 'WHERE day BETWEEN ? AND ?', (day_ordinal(start_date), day_ordinal(end_date))
+
+    def symptom_catalog(self):
+        """symptom_catalog() method returns the SymptomCatalog of the terms stored in the database,
+        the terms are read once and the catalog is searched in memory, a search made while the catalog thread
+        is reading the terms waits for it"""
+        with self.catalog_lock:
+            if self.catalog is None:
+                with self.connection() as db:
+                    rows = db.execute('SELECT name FROM symptom_catalog ORDER BY id').fetchall()
+                self.catalog = SymptomCatalog(name for (name,) in rows)
+        return self.catalog
+
+    def load_symptom_catalog(self):
+        """load_symptom_catalog() method reads the catalog of symptoms on the catalog thread"""
+        try:
+            self.symptom_catalog()
+        except sqlite3.Error:
+            # the error is raised again by the first search, which reads the catalog itself
+            pass
+
+    def add_symptom_terms(self, terms, user_defined=True):
+        """add_symptom_terms() method stores the terms, which aren't in the catalog of symptoms yet,
+        in one transaction, e.g. to import a vocabulary, and adds them to the catalog"""
+        terms = [' '.join(term.split()) for term in terms]
+        catalog = self.symptom_catalog()
+        with self.connection() as db, db:
+            db.executemany('INSERT OR IGNORE INTO symptom_catalog(name, user_defined) VALUES(?, ?)',
+                           ((term, int(user_defined)) for term in terms if term))
+        if len(terms) == 1:
+            catalog.add_term(terms[0])
+        else:
+            catalog.add_terms(terms)
+
+    def search(self, query, start_date=None, end_date=None, limit=50):
+        """search() method returns at most limit records between dates (or of all records, if dates aren't specified)
+        containing all words of the query, or words starting with them, the most relevant records first.
+        The query runs against the FTS5 index ranked by bm25 with words of titles weighted twice,
+        only the found records are read from the database"""
+        match = match_query(query)
+        if match == '':
+            return []
+        condition, parameters = '', ()
+        if start_date is not None and end_date is not None:
+            condition, parameters = 'AND e.day BETWEEN ? AND ? ', (day_ordinal(start_date), day_ordinal(end_date))
+        return self.select_records('SELECT e.rowid, e.title, e.text, e.mood, e.symptoms, e.date, e.day '
+                                   'FROM entries_fts JOIN entries e ON e.rowid = entries_fts.rowid '
+                                   'WHERE entries_fts MATCH ? ' + condition +
+                                   'ORDER BY bm25(entries_fts, 2.0, 1.0) LIMIT ?',
+                                   (match,) + parameters + (limit,))
+
+    def get_records_with_symptom(self, symptom, start_date=None, end_date=None):
+        """get_records_with_symptom() method returns a list of records between dates
+        (or of all records, if dates aren't specified) mentioning the symptom"""
+        start_day, end_day = self.days_between_dates(start_date, end_date)
+        return self.select_records('SELECT e.rowid, e.title, e.text, e.mood, e.symptoms, e.date, e.day '
+                                   'FROM symptoms s '
+                                   'JOIN entry_symptoms es ON es.symptom_id = s.id '
+                                   'JOIN entries e ON e.rowid = es.entry_id '
+                                   'WHERE s.name = ? AND es.day BETWEEN ? AND ? '
+                                   'ORDER BY es.day, es.entry_id',
+                                   (symptom, start_day, end_day))
+
+    def iter_records(self, start_date=None, end_date=None, page_size=50, after=None):
+        """iter_records() method yields records between dates (or all records, if dates aren't specified)
+        from the newest date to the oldest one, reading them from the database page by page.
+        Pages use keyset pagination: every query continues after the (day, rowid) of the last row of the previous page
+        through the index on the day column, so a page costs the same no matter how deep into the diary it is.
+        If the record passed as after is specified, the iteration starts right after it"""
+        start_day, end_day = self.days_between_dates(start_date, end_date)
+        if after is not None:
+            cursor = (after.day, after.record_id)
+        else:
+            cursor = (end_day, MAX_ROWID)
+        while True:
+            records = self.select_records('SELECT rowid, title, text, mood, symptoms, date, day FROM entries '
+                                          'WHERE day BETWEEN ? AND ? AND (day, rowid) < (?, ?) '
+                                          'ORDER BY day DESC, rowid DESC LIMIT ?',
+                                          (start_day, end_day, cursor[0], cursor[1], page_size))
+            yield from records
+            if len(records) < page_size:
+                break
+            cursor = (records[-1].day, records[-1].record_id)
+
+
+# create ColumnarRecordList class for storing very large histories in compact columns
+class ColumnarRecordList(RecordList):
+    def __init__(self):
+        super().__init__()
+        # one array per attribute of records, all columns are sorted by day and id of records,
+        # so records between dates are a slice of the columns found by binary search on the days column
+        self.ids = array('q')
+        self.days = array('i')
+        self.moods = array('d')
+        # titles and texts of records are stored one after another as UTF-8 in a single buffer,
+        # the offset of the title and the lengths of the title and the text locate them in the buffer
+        self.strings = bytearray()
+        self.offsets = array('q')
+        self.title_lengths = array('i')
+        self.text_lengths = array('i')
+        # every distinct text of symptoms is stored once, columns keep the index of the text
+        self.symptom_texts = []
+        self.symptom_keys = {}
+        self.symptoms = array('i')
+        # number of bytes of removed records left in the buffer of strings
+        self.removed_bytes = 0
+
+    def store_record(self, title, text, mood, symptoms, date):
+        """store_record() method adds the attributes of a new record to the columns without notifying subscribers,
+        mood must be a number and records with dates which can't be parsed are stored with day 0"""
+        record = Record(self.next_id, title, text, mood, symptoms, date)
+        self.next_id += 1
+        # new records have the greatest id, so they go after all records of the same day
+        index = bisect_right(self.days, record.day or 0)
+        self.append_record(record)
+        if index < len(self.days) - 1:
+            for column in self.columns():
+                column.insert(index, column.pop())
+        return record
+
+    def columns(self):
+        """columns() method returns the columns, which have a value for every row"""
+        return (self.ids, self.days, self.moods, self.offsets, self.title_lengths, self.text_lengths, self.symptoms)
+
+    def add_records(self, records):
+        """add_records() method appends the attributes of every (title, text, mood, symptoms, date) tuple
+        to the columns and then sorts the rows of the columns once, so loading a large history costs O(n log n)
+        instead of an insert in the middle of the columns for every record, subscribers are notified once"""
+        stored_number = len(self.ids)
+        added = []
+        number = 0
+        for title, text, mood, symptoms, date in records:
+            record = Record(self.next_id, title, text, mood, symptoms, date)
+            self.next_id += 1
+            self.append_record(record)
+            number += 1
+            if number <= self.max_event_records:
+                added.append(record)
+        if number == 0:
+            return
+        # rows of the columns are sorted by day, then by id, appended rows have greater ids than the stored ones,
+        # so a stable sort by day keeps ids of the same day in order
+        if any(self.days[index - 1] > self.days[index] for index in range(max(stored_number, 1), len(self.days))):
+            self.sort_rows()
+        self.notify_added(added, number)
+
+    def append_record(self, record: Record):
+        """append_record() method appends the attributes of the record to the end of the columns"""
+        title_bytes = record.title.encode()
+        text_bytes = record.text.encode()
+        key = self.symptom_keys.get(record.symptoms)
+        if key is None:
+            key = self.symptom_keys[record.symptoms] = len(self.symptom_texts)
+            self.symptom_texts.append(record.symptoms)
+        self.ids.append(record.record_id)
+        self.days.append(record.day or 0)
+        self.moods.append(float(record.mood))
+        self.offsets.append(len(self.strings))
+        self.title_lengths.append(len(title_bytes))
+        self.text_lengths.append(len(text_bytes))
+        self.symptoms.append(key)
+        self.strings += title_bytes
+        self.strings += text_bytes
+        self.index_record(record, 1)
+
+    def sort_rows(self):
+        """sort_rows() method reorders the rows of all columns by day with a single permutation"""
+        if numpy is not None:
+            order = numpy.argsort(numpy.frombuffer(self.days, dtype=numpy.int32), kind='stable')
+            for column in self.columns():
+                column[:] = array(column.typecode, numpy.frombuffer(column, dtype=column.typecode)[order].tobytes())
+            return
+        order = sorted(range(len(self.days)), key=self.days.__getitem__)
+        for column in self.columns():
+            column[:] = array(column.typecode, [column[index] for index in order])
+
+    def remove_record(self, record: Record):
+        """remove_record() method removes the attributes of the record from the columns
+        and notifies subscribers, nothing happens if the record isn't stored"""
+        day = record.day or 0
+        start = bisect_left(self.days, day)
+        end = bisect_right(self.days, day)
+        try:
+            index = self.ids.index(record.record_id, start, end)
+        except ValueError:
+            return
+        stored = self.record(index)
+        self.removed_bytes += self.title_lengths[index] + self.text_lengths[index]
+        for column in self.columns():
+            del column[index]
+        if self.removed_bytes > len(self.strings) // 2:
+            self.compact()
+        self.index_record(stored, -1)
+        self.notify_subscribers(RecordEvent(RecordEvent.REMOVED, [stored]))
+
+    def compact(self):
+        """compact() method rewrites the buffer of strings without the strings of removed records"""
+        strings = bytearray()
+        for index in range(len(self.ids)):
+            offset = self.offsets[index]
+            self.offsets[index] = len(strings)
+            strings += self.strings[offset:offset + self.title_lengths[index] + self.text_lengths[index]]
+        self.strings = strings
+        self.removed_bytes = 0
+
+    def record(self, index):
+        """record() method creates an instance of Record class from the row of the columns at the index"""
+        offset = self.offsets[index]
+        middle = offset + self.title_lengths[index]
+        end = middle + self.text_lengths[index]
+        day = self.days[index]
+        date = Date.fromordinal(day).isoformat() if day > 0 else ''
+        return Record(self.ids[index], self.strings[offset:middle].decode(), self.strings[middle:end].decode(),
+                      self.moods[index], self.symptom_texts[self.symptoms[index]], date, day or None)
+
+    @property
+    def Records(self):
+        """list of all records sorted by date"""
+        return self.get_records()
+
+    def get_records(self):
+        """get_records() method returns all records sorted by date"""
+        return [self.record(index) for index in range(len(self.ids))]
+
+    def get_records_between_dates(self, start_date, end_date):
+        """get_records_between_dates() method returns a list of records between dates sorted by date"""
+        start, end = self.sorted_range(day_ordinal(start_date), day_ordinal(end_date))
+        return [self.record(index) for index in range(start, end)]
+
+    def sorted_range(self, start_day, end_day):
+        """sorted_range() method returns the slice of the columns with records between days"""
+        return bisect_left(self.days, start_day), bisect_right(self.days, end_day)
+
+    def iter_records(self, start_date=None, end_date=None, page_size=50, after=None):
+        """iter_records() method yields records between dates (or all records, if dates aren't specified)
+        from the newest date to the oldest one, and continues after the record passed as after, if it is specified"""
+        start_day, end_day = self.days_between_dates(start_date, end_date)
+        cursor = (end_day, MAX_ROWID)
+        if after is not None:
+            cursor = min(cursor, (after.day, after.record_id))
+        while True:
+            end = self.key_index(cursor)
+            start = max(bisect_left(self.days, start_day), end - page_size)
+            page = [self.record(index) for index in range(start, end)]
+            yield from reversed(page)
+            if len(page) < page_size:
+                break
+            cursor = (page[0].day, page[0].record_id)
+
+    def record_by_key(self, key):
+        return self.record(self.key_index(key))
+
+    def key_index(self, key):
+        """key_index() method returns the number of rows with (day, id) less than the key"""
+        day, record_id = key
+        start, end = self.sorted_range(day, day)
+        return bisect_left(self.ids, record_id, start, end)
+
+    def count_between_dates(self, start_date=None, end_date=None):
+        """count_between_dates() method returns the number of records between dates
+        (or of all records, if dates aren't specified)"""
+        start, end = self.sorted_range(*self.days_between_dates(start_date, end_date))
+        return end - start
+
+    def average_mood_between_dates(self, start_date=None, end_date=None):
+        """average_mood_between_dates() method returns the average mood level of records between dates
+        (or of all records, if dates aren't specified), summing the slice of the moods column"""
+        start, end = self.sorted_range(*self.days_between_dates(start_date, end_date))
+        if end == start:
+            return 0
+        if numpy is not None:
+            total = float(numpy.frombuffer(self.moods, dtype=numpy.float64)[start:end].sum())
+        else:
+            total = sum(self.moods[start:end])
+        return round(total / (end - start), 1)
+
+    def symptom_counts(self, start_date=None, end_date=None):
+        """symptom_counts() method returns a dictionary of symptoms and the number of entries between dates
+        (or of all entries, if dates aren't specified) mentioning them, the most frequent symptoms first,
+        counting the distinct texts of symptoms in the slice of the symptoms column"""
+        start, end = self.sorted_range(*self.days_between_dates(start_date, end_date))
+        if numpy is not None:
+            counts = numpy.bincount(numpy.frombuffer(self.symptoms, dtype=numpy.int32)[start:end])
+            key_counts = {key: int(number) for key, number in enumerate(counts) if number > 0}
+        else:
+            key_counts = Counter(self.symptoms[start:end])
+        symptoms = Counter()
+        for key, number in key_counts.items():
+            for symptom in symptom_names(self.symptom_texts[key]):
+                symptoms[symptom] += number
+        return ranked_counts(symptoms)
+
+    def get_records_with_symptom(self, symptom, start_date=None, end_date=None):
+        """get_records_with_symptom() method returns a list of records between dates
+        (or of all records, if dates aren't specified) mentioning the symptom"""
+        keys = {key for key, text in enumerate(self.symptom_texts) if symptom in text.split(',')}
+        start, end = self.sorted_range(*self.days_between_dates(start_date, end_date))
+        return [self.record(index) for index in range(start, end) if self.symptoms[index] in keys]
+
+
+# create AsyncRecordListDB class giving asyncio access to a RecordListDB,
+# all database work runs on a dedicated executor thread, so it never blocks the event loop
+class AsyncRecordListDB:
+    def __init__(self, database_path: str, **options):
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='RecordListDB')
+        self.loop = None
+        self.subscribers = {}
+        # the store is created on the executor thread, which runs all database work of the store,
+        # open() creates the store without a database path and awaits opening the database
+        self.record_list = None
+        if database_path is not None:
+            self.record_list = self.executor.submit(RecordListDB, database_path, **options).result()
+
+    @classmethod
+    async def open(cls, database_path: str, **options):
+        """open() method returns a new AsyncRecordListDB, awaiting the database to be opened and migrated
+        on the executor thread, so opening a large database file doesn't block the event loop"""
+        store = cls(None)
+        store.record_list = await store.run(RecordListDB, database_path, **options)
+        return store
+
+    async def run(self, method, *args, **kwargs):
+        """run() method runs the method of the store on the executor thread and returns its result"""
+        self.loop = asyncio.get_running_loop()
+        return await self.loop.run_in_executor(self.executor, partial(method, *args, **kwargs))
+
+    @property
+    def generation(self):
+        return self.record_list.generation
+
+    async def add_record(self, title, text, mood, symptoms, date):
+        await self.run(self.record_list.add_record, title, text, mood, symptoms, date)
+
+    async def add_records(self, records):
+        await self.run(self.record_list.add_records, records)
+
+    async def remove_record(self, record: Record):
+        await self.run(self.record_list.remove_record, record)
+
+    async def flush(self):
+        await self.run(self.record_list.flush)
+
+    async def get_records(self):
+        return await self.run(self.record_list.get_records)
+
+    async def get_records_between_dates(self, start_date, end_date):
+        return await self.run(self.record_list.get_records_between_dates, start_date, end_date)
+
+    async def summarize(self, start_date=None, end_date=None):
+        return await self.run(self.record_list.summarize, start_date, end_date)
+
+    async def symptom_counts(self, start_date=None, end_date=None):
+        return await self.run(self.record_list.symptom_counts, start_date, end_date)
+
+    async def get_records_with_symptom(self, symptom, start_date=None, end_date=None):
+        return await self.run(self.record_list.get_records_with_symptom, symptom, start_date, end_date)
+
+    async def search(self, query, start_date=None, end_date=None, limit=50):
+        return await self.run(self.record_list.search, query, start_date, end_date, limit)
+
+    async def get_daily_statistics(self, start_date, end_date):
+        return await self.run(self.record_list.get_daily_statistics, start_date, end_date)
+
+    async def search_symptoms(self, query, limit=10):
+        return await self.run(self.record_list.search_symptoms, query, limit)
+
+    async def add_symptom_terms(self, terms):
+        await self.run(self.record_list.add_symptom_terms, terms)
+
+    async def get_page(self, start_date=None, end_date=None, page_size=50, after=None):
+        """get_page() method returns a list of at most page_size records, which iter_records() would yield first"""
+        return await self.run(lambda: list(islice(self.record_list.iter_records(start_date, end_date,
+                                                                                page_size, after), page_size)))
+
+    async def iter_records(self, start_date=None, end_date=None, page_size=50, after=None):
+        """iter_records() method is an asynchronous generator of records, reading one page at a time"""
+        while True:
+            page = await self.get_page(start_date, end_date, page_size, after)
+            for record in page:
+                yield record
+            if len(page) < page_size:
+                break
+            after = page[-1]
+
+    def add_subscriber(self, callback, events=False):
+        """add_subscriber() method subscribes the callback to changes of the store, coroutine functions
+        are scheduled on the event loop, other callbacks are called on the executor thread"""
+        def notify(*args):
+            if asyncio.iscoroutinefunction(callback):
+                asyncio.run_coroutine_threadsafe(callback(*args), self.loop)
+            else:
+                callback(*args)
+        self.subscribers[callback] = notify
+        self.record_list.add_subscriber(notify, events)
+
+    def remove_subscriber(self, callback):
+        if callback in self.subscribers:
+            self.record_list.remove_subscriber(self.subscribers.pop(callback))
+
+    async def close(self):
+        await self.run(self.record_list.close)
+        self.executor.shutdown()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+
+# create RecordCache class keeping results of range queries and summaries of a record store,
+# the least recently used results are dropped when there are more than max_size of them
+# and all results are dropped when the generation of the store changes
+class RecordCache:
+    def __init__(self, record_list, max_size=64):
+        self.record_list = record_list
+        self.max_size = max_size
+        self.results = OrderedDict()
+        self.generation = record_list.generation
+        self.hits = 0
+        self.misses = 0
+
+    def cached(self, key, query):
+        """cached() method returns the result stored under the key, or calls the query and stores its result"""
+        if self.generation != self.record_list.generation:
+            self.results.clear()
+            self.generation = self.record_list.generation
+        if key in self.results:
+            self.hits += 1
+            self.results.move_to_end(key)
+            return self.results[key]
+        self.misses += 1
+        result = query()
+        self.results[key] = result
+        if len(self.results) > self.max_size:
+            self.results.popitem(last=False)
+        return result
+
+    def get_records_between_dates(self, start_date, end_date):
+        return self.cached(('records', start_date, end_date),
+                           lambda: self.record_list.get_records_between_dates(start_date, end_date))
+
+    def summarize(self, start_date=None, end_date=None):
+        return self.cached(('summary', start_date, end_date),
+                           lambda: self.record_list.summarize(start_date, end_date))
+
+    def search(self, query, start_date=None, end_date=None, limit=50):
+        return self.cached(('search', query, start_date, end_date, limit),
+                           lambda: self.record_list.search(query, start_date, end_date, limit))
+
+    def iter_records(self, start_date=None, end_date=None, page_size=50, after=None):
+        """iter_records() method yields records like iter_records() of the store, every page is cached separately"""
+        while True:
+            cursor = None if after is None else (after.day, after.record_id)
+            page = self.cached(('page', start_date, end_date, page_size, cursor),
+                               lambda: list(islice(self.record_list.iter_records(start_date, end_date,
+                                                                                 page_size, after), page_size)))
+            yield from page
+            if len(page) < page_size:
+                break
+            after = page[-1]
 
 
 # create Analytics class to analyze records for summary view
@@ -196,6 +1593,11 @@ class Analytics:
         symptoms = symptoms[:-1]
         return symptoms
 
+    @staticmethod
+    def symptoms_text(symptoms: dict):
+        """symptoms_text() method transforms symptoms of Summary to text suitable for displaying summary view"""
+        return ','.join('%s (%s)' % (symptom, number) for symptom, number in symptoms.items())
+
 
 if __name__ == '__main__':
     pass
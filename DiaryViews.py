@@ -1,15 +1,29 @@
-from collections import deque
+import asyncio
+import inspect
+import threading
+from contextlib import contextmanager, asynccontextmanager
+from itertools import islice
 import flet as ft
 from flet_core import UserControl
 from DiaryRecords import Record
 from datetime import datetime
 
 
+async def call_subscriber_async(callback, *args):
+    """call_subscriber_async() function calls the callback of a subscriber from an async event handler
+    and awaits the result of an async callback, so the handler finishes after the subscribers"""
+    result = callback(*args)
+    if inspect.isawaitable(result):
+        await result
+
+
 # RecordView class displays a view element of a created record
 class RecordView(UserControl):
-    def __init__(self, record: Record):
+    def __init__(self, record: Record, is_async=False):
         super().__init__()
         self.value = record
+        # in Flet's async mode the delete button has an async handler awaiting the subscribers
+        self.is_async = is_async
         # implement observer pattern here by creating a list of subscribers
         self.subscribers = []
         self.view = None
@@ -36,7 +50,7 @@ class RecordView(UserControl):
             icon_color="pink700",
             icon_size=30,
             tooltip="Delete record",
-            on_click=self.on_delete_click)
+            on_click=self.on_delete_click_async if self.is_async else self.on_delete_click)
         date_delete_button_row = ft.Row(
             controls=[
                 ft.Text('Date: ', size=15),
@@ -63,6 +77,10 @@ class RecordView(UserControl):
         """on_delete_click() method is called when on_click event of delete button of record view is happened"""
         self.notify_subscribers()
 
+    async def on_delete_click_async(self, e):
+        """on_delete_click_async() method is on_delete_click() in Flet's async mode"""
+        await self.notify_subscribers_async()
+
     def add_subscriber(self, callback):
         self.subscribers.append(callback)
 
@@ -75,9 +93,70 @@ class RecordView(UserControl):
         for callback in self.subscribers:
             callback(self.value)
 
+    async def notify_subscribers_async(self):
+        for callback in self.subscribers:
+            await call_subscriber_async(callback, self.value)
+
+
+# BatchedUpdates class is a mixin for user controls, which collects update() calls made inside batch() blocks
+# and sends a single update to the page, when the outermost block is finished,
+# updates of the batched controls inside the control passed into batch() are sent by the same update
+class BatchedUpdates:
+    batch_depth = 0
+    update_pending = False
 
-class RecordListView(UserControl):
-    def __init__(self, value=None, date=None):
+    @contextmanager
+    def batch(self, *children):
+        self.begin_batch(children)
+        try:
+            yield self
+        finally:
+            if self.end_batch(children):
+                super().update()
+
+    @asynccontextmanager
+    async def batch_async(self, *children):
+        """batch_async() method is batch() for async handlers, which await inside the block"""
+        self.begin_batch(children)
+        try:
+            yield self
+        finally:
+            if self.end_batch(children):
+                await super().update_async()
+
+    def begin_batch(self, children):
+        self.batch_depth += 1
+        for child in children:
+            child.batch_depth += 1
+
+    def end_batch(self, children):
+        """end_batch() method finishes the block and returns True, if the collected update must be sent"""
+        for child in children:
+            child.batch_depth -= 1
+            if child.batch_depth == 0 and child.update_pending:
+                child.update_pending = False
+                self.update_pending = True
+        self.batch_depth -= 1
+        if self.batch_depth == 0 and self.update_pending:
+            self.update_pending = False
+            return True
+        return False
+
+    def update(self):
+        if self.batch_depth > 0:
+            self.update_pending = True
+        else:
+            super().update()
+
+    async def update_async(self):
+        if self.batch_depth > 0:
+            self.update_pending = True
+        else:
+            await super().update_async()
+
+
+class RecordListView(BatchedUpdates, UserControl):
+    def __init__(self, value=None, date=None, page_size=20, window_size=30, item_height=200, is_async=False):
         super().__init__()
         self._value = value
         if self._value is None:
@@ -87,6 +166,32 @@ class RecordListView(UserControl):
         self.subscribers = []
         self.list_view = None
         self.view = None
+        # records are loaded page by page: the source yields records in the displayed order
+        # and the next page is taken from it only when the user scrolls close to the end of the loaded records
+        self.page_size = page_size
+        self._source = reversed(self._value)
+        self.records = []
+        self.exhausted = False
+        # in Flet's async mode the pages following the records of the source are awaited from next_page,
+        # a coroutine function returning the page after the record passed into it, while the list is scrolled
+        self.is_async = is_async
+        self.next_page = None
+        # only the window of records in or near the viewport has views, records before and after the window
+        # are replaced by spacers with heights estimated by the fixed height of a record view
+        self.window_size = window_size
+        self.item_height = item_height
+        self.first = 0
+        self.last = 0
+        self.loaded = 0
+        self.top_spacer = ft.Container(height=0)
+        self.bottom_spacer = ft.Container(height=0)
+        # views of the records in the window by record ids, reused when the window moves or records are replaced
+        self.record_views = {}
+        # Flet calls every sync event handler on a thread of its own, so scroll events and changes of the records
+        # move the window one at a time, the source and the loaded records are only used under the lock,
+        # async scroll handlers awaiting the next pages run one at a time too
+        self.window_lock = threading.RLock()
+        self.scroll_lock = asyncio.Lock()
 
     @property
     def value(self):
@@ -94,42 +199,180 @@ class RecordListView(UserControl):
 
     @value.setter
     def value(self, list_of_entries):
+        """the newest entries of the list are displayed first"""
         self._value = list_of_entries
-        if self.page is not None:
-            self.update_view()
+        self.source = reversed(list_of_entries)
+
+    @property
+    def source(self):
+        return self._source
+
+    @source.setter
+    def source(self, records):
+        """source is an iterable of records in the displayed order, e.g. RecordList.iter_records()"""
+        with self.window_lock:
+            self._source = iter(records)
+            self.records = []
+            self.exhausted = False
+            if self.page is not None:
+                self.update_view()
+            else:
+                # the window is displayed again, when the view is built or mounted
+                self.first = self.last = -1
 
     def build(self):
         self.list_view = ft.ListView(expand=1,
-                                     auto_scroll=False)
+                                     auto_scroll=False,
+                                     on_scroll_interval=100,
+                                     on_scroll=self.list_scrolled_async if self.is_async else self.list_scrolled)
         self.view = ft.Container(content=self.list_view,
                                  expand=True,
                                  alignment=ft.alignment.top_center)
-        records = deque()
-        for record in self._value:
-            records.appendleft(record)
-        for record in records:
-            record_view = RecordView(record)
-            self.list_view.controls.append(record_view)
-            record_view.add_subscriber(lambda x: self.record_deleted(x))
+        # the first window is sent with the first render of the view, without an update of its own
+        self.first = self.last = -1
+        self.show_window(0)
         return self.view
 
     def did_mount(self):
-        self.update_view()
+        """the window is displayed again, if the source has been replaced, while the view wasn't on the page,
+        the records already taken from the source are kept when the view is mounted again"""
+        if self.first == -1:
+            self.update_view()
+
+    async def did_mount_async(self):
+        if self.first == -1:
+            self.show_first_window()
+            await self.update_async()
 
     def update_view(self):
-        self.list_view.clean()
-        records = deque()
-        for record in self._value:
-            records.appendleft(record)
-        for record in records:
-            record_view = RecordView(record)
-            self.list_view.controls.append(record_view)
-            record_view.add_subscriber(lambda x: self.record_deleted(x))
+        """update_view() method displays the first window of the new source, views of records,
+        which are displayed already, are reused, so only added and removed views are sent to the page"""
+        with self.window_lock:
+            self.show_first_window()
+            self.update()
+
+    def show_first_window(self):
+        self.records = []
+        self.first = self.last = -1
+        self.show_window(0)
+
+    def load_records(self, number):
+        """load_records() method takes pages of records from the source until number of records is loaded
+        or the source is exhausted"""
+        while len(self.records) < number and not self.exhausted:
+            page = list(islice(self._source, self.page_size))
+            if len(page) < self.page_size:
+                self.exhausted = True
+            self.records.extend(page)
+
+    async def load_records_async(self, number):
+        """load_records_async() method is load_records() awaiting the pages from next_page,
+        when all records of the source are loaded"""
+        self.load_records(number)
+        while len(self.records) < number and self.next_page is not None:
+            next_page = self.next_page
+            page = await next_page(self.records[-1] if self.records else None)
+            if next_page is not self.next_page:
+                # the source has been replaced, while the page was awaited
+                return
+            if len(page) < self.page_size:
+                self.next_page = None
+            self.records.extend(page)
+
+    @property
+    def all_loaded(self):
+        return self.exhausted and self.next_page is None
+
+    def show_window(self, first):
+        """show_window() method creates the views of records in the window starting from the first record
+        and sets heights of the spacers, it returns False if the window hasn't changed"""
+        last = first + self.window_size
+        self.load_records(last + self.page_size)
+        last = min(last, len(self.records))
+        first = min(first, max(0, last - self.window_size))
+        previous_views = self.record_views
+        if (first, last, len(self.records)) == (self.first, self.last, self.loaded):
+            return False
+        self.first, self.last, self.loaded = first, last, len(self.records)
+        self.record_views = {}
+        controls = [self.top_spacer]
+        for record in self.records[first:last]:
+            controls.append(self.create_record_view(record, previous_views))
+        controls.append(self.bottom_spacer)
+        self.top_spacer.height = first * self.item_height
+        self.bottom_spacer.height = (len(self.records) - last) * self.item_height
+        self.list_view.controls = controls
+        return True
+
+    def create_record_view(self, record, previous_views):
+        """create_record_view() method returns the view of the record, taking it from the previous views,
+        if the record hasn't changed since it was displayed"""
+        record_view = previous_views.pop(record.record_id, None)
+        if record_view is None or not self.same_record(record_view.value, record):
+            record_view = RecordView(record, self.is_async)
+            if self.is_async:
+                record_view.add_subscriber(self.record_deleted_async)
+            else:
+                record_view.add_subscriber(lambda x: self.record_deleted(x))
+        self.record_views[record.record_id] = record_view
+        return record_view
+
+    @staticmethod
+    def same_record(record, other):
+        return ((record.title, record.text, record.mood, record.symptoms, record.date) ==
+                (other.title, other.text, other.mood, other.symptoms, other.date))
+
+    def insert_records(self, records):
+        """insert_records() method adds new records at their places among the loaded records,
+        which are sorted from the newest date to the oldest one, records placed after the loaded records
+        are left for the next pages of the source"""
+        with self.window_lock:
+            for record in records:
+                key = (record.day or 0, record.record_id)
+                index = 0
+                while (index < len(self.records) and
+                       (self.records[index].day or 0, self.records[index].record_id) > key):
+                    index += 1
+                if index == len(self.records) and not self.all_loaded:
+                    continue
+                self.records.insert(index, record)
+            self.refresh_window()
+
+    def remove_records(self, records):
+        """remove_records() method removes the records from the list"""
+        removed_ids = {record.record_id for record in records}
+        with self.window_lock:
+            self.records = [record for record in self.records if record.record_id not in removed_ids]
+            self.refresh_window()
+
+    def refresh_window(self):
+        """refresh_window() method displays the current window again after the loaded records are changed"""
+        first = self.first
+        self.first = self.last = -1
+        self.show_window(first)
         self.update()
 
+    def list_scrolled(self, e):
+        """list_scrolled() method moves the window to the records in or near the viewport"""
+        first_visible = int(e.pixels // self.item_height)
+        with self.window_lock:
+            if self.show_window(max(0, first_visible - self.window_size // 3)):
+                self.update()
+
+    async def list_scrolled_async(self, e):
+        """list_scrolled_async() method is list_scrolled() awaiting the next pages of the list"""
+        first = max(0, int(e.pixels // self.item_height) - self.window_size // 3)
+        async with self.scroll_lock:
+            await self.load_records_async(first + self.window_size + self.page_size)
+            if self.show_window(first):
+                await self.update_async()
+
     def record_deleted(self, record):
         self.notify_subscribers(record)
 
+    async def record_deleted_async(self, record):
+        await self.notify_subscribers_async(record)
+
     def add_subscriber(self, callback):
         self.subscribers.append(callback)
 
@@ -140,14 +383,18 @@ class RecordListView(UserControl):
         for callback in self.subscribers:
             callback(*args)
 
+    async def notify_subscribers_async(self, *args):
+        for callback in self.subscribers:
+            await call_subscriber_async(callback, *args)
+
 
-class StatisticsView(UserControl):
+class StatisticsView(BatchedUpdates, UserControl):
     def __init__(self):
         super().__init__()
         self._entries_number = 0
         self._average_mood = 0
         self._symptoms = ''
-        self.stat_text = ft.Text("", size=15)
+        self.stat_text = ft.Text(self.build_stat_text(), size=15)
         container = ft.Container(content=self.stat_text)
 
         self.view = ft.Container(content=container,
@@ -165,8 +412,7 @@ class StatisticsView(UserControl):
     @entries_number.setter
     def entries_number(self, number):
         self._entries_number = number
-        if self.page is not None:
-            self.update_view()
+        self.update_view()
 
     @property
     def average_mood(self):
@@ -175,8 +421,7 @@ class StatisticsView(UserControl):
     @average_mood.setter
     def average_mood(self, average_mood):
         self._average_mood = average_mood
-        if self.page is not None:
-            self.update_view()
+        self.update_view()
 
     @property
     def symptoms(self):
@@ -185,8 +430,7 @@ class StatisticsView(UserControl):
     @symptoms.setter
     def symptoms(self, symptoms):
         self._symptoms = symptoms
-        if self.page is not None:
-            self.update_view()
+        self.update_view()
 
     def build(self):
         return self.view
@@ -197,16 +441,16 @@ You had entered {str(self._entries_number)} diary entries.\r
 Your average mood level was {str(self._average_mood)}.\r
 Your symptoms and the number of times each one has irritated you are listed here: {self._symptoms}.'''
 
-    def did_mount(self):
-        self.update_view()
-
     def update_view(self):
+        """update_view() method sets the text of the statistics, which is sent with the first render of the view,
+        if it isn't on the page yet"""
         self.stat_text.value = self.build_stat_text()
-        self.update()
+        if self.page is not None:
+            self.update()
 
 
 class DateSelectionView(UserControl):
-    def __init__(self):
+    def __init__(self, is_async=False):
         super().__init__()
         self.select_start_date = None
         self.select_end_date = None
@@ -214,6 +458,8 @@ class DateSelectionView(UserControl):
         self.selected_date = None
         self.subscribers = []
         self.button = None
+        # in Flet's async mode the buttons have async handlers awaiting the subscribers
+        self.is_async = is_async
 
     def build(self):
         self.select_start_date = ft.TextField(label='Start date YYYY-MM-DD',
@@ -225,11 +471,13 @@ class DateSelectionView(UserControl):
         button_entries = ft.ElevatedButton(text='Display entries',
                                            expand=True,
                                                 style=ft.ButtonStyle(shape=ft.RoundedRectangleBorder(radius=5)),
-                                                on_click=lambda e: self.date_selected('ent'))
+                                                on_click=self.entries_clicked_async if self.is_async
+                                                else lambda e: self.date_selected('ent'))
         button_statistics = ft.ElevatedButton(text='Display statistics',
                                               expand=True,
                                                    style=ft.ButtonStyle(shape=ft.RoundedRectangleBorder(radius=5)),
-                                                   on_click=lambda e: self.date_selected('stat'))
+                                                   on_click=self.statistics_clicked_async if self.is_async
+                                                   else lambda e: self.date_selected('stat'))
         self.view = ft.Row(controls=[self.select_start_date,
                                      self.select_end_date,
                                      button_entries,
@@ -238,15 +486,26 @@ class DateSelectionView(UserControl):
         return self.view
 
     def date_selected(self, button):
+        self.select_dates(button)
+        self.notify_subscribers()
+
+    async def entries_clicked_async(self, e):
+        self.select_dates('ent')
+        await self.notify_subscribers_async()
+
+    async def statistics_clicked_async(self, e):
+        self.select_dates('stat')
+        await self.notify_subscribers_async()
+
+    def select_dates(self, button):
+        """select_dates() method stores the clicked button and the typed dates, or None, if they aren't valid"""
         self.button = button
         try:
             datetime.strptime(self.select_start_date.value, '%Y-%m-%d')
             datetime.strptime(self.select_end_date.value, '%Y-%m-%d')
             self.selected_date = (self.select_start_date.value, self.select_end_date.value)
-            self.notify_subscribers()
         except ValueError:
             self.selected_date = None
-            self.notify_subscribers()
 
     def add_subscriber(self, callback):
         self.subscribers.append(callback)
@@ -257,3 +516,7 @@ class DateSelectionView(UserControl):
     def notify_subscribers(self):
         for callback in self.subscribers:
             callback()
+
+    async def notify_subscribers_async(self):
+        for callback in self.subscribers:
+            await call_subscriber_async(callback)
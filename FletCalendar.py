@@ -1,14 +1,35 @@
 import calendar
 import datetime
+import threading
 from calendar import HTMLCalendar
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import flet as ft
 from dateutil.relativedelta import relativedelta
+from DiaryRecords import AsyncRecordListDB
+
+
+# colors of days with entries in the heat map, from the lowest average mood to the highest one
+HEAT_COLORS = [ft.colors.RED_200, ft.colors.ORANGE_200, ft.colors.AMBER_200, ft.colors.LIGHT_GREEN_200,
+               ft.colors.GREEN_300]
+
+
+# MonthView class keeps the controls of a displayed month: the column with the grid of days,
+# the text with the date above the grid and the cells of the days by day numbers
+class MonthView:
+    def __init__(self, column, date_display, day_cells):
+        self.column = column
+        self.date_display = date_display
+        self.day_cells = day_cells
+        # the day displayed in bold and the statistics of days the cells are colored by
+        self.bold_day = None
+        self.statistics = None
 
 
 # FletCalendar class is an interface for displaying calendar,
 # which is as a part of interface for creating a record in RecordCreatorView class
 class FletCalendar(ft.UserControl):
-    def __init__(self):
+    def __init__(self, record_list=None, max_months=12):
         super().__init__()
 
         self.current_day, self.current_month, self.current_year = self.get_current_date()
@@ -20,7 +41,42 @@ class FletCalendar(ft.UserControl):
                                                border_radius=ft.border_radius.all(10),
                                                alignment=ft.alignment.bottom_center)
         self.selected_date = False
-        self.build()  # Build the calendar.
+        # controls of the months, which have been displayed, by (year, month), the least recently displayed month
+        # leaves the cache, when there are more than max_months months in it
+        self.months = OrderedDict()
+        self.max_months = max_months
+        # days with entries are colored by their average mood, if the calendar has a record store,
+        # statistics of a month are read with one query of daily statistics and cached by (year, month),
+        # the months before and after the displayed one are queried in advance on the prefetch thread
+        self.record_list = record_list
+        self.month_statistics_cache = {}
+        self.statistics_lock = threading.Lock()
+        self.prefetcher = None
+        # with an AsyncRecordListDB the handlers of Flet's async mode paint months from the cache
+        # and await the statistics of a month, which isn't there, the prefetch thread queries its database store
+        self.async_record_list = None
+        self.records_changed_handler = self.records_changed
+        if isinstance(record_list, AsyncRecordListDB):
+            self.async_record_list = record_list
+            self.record_list = record_list.record_list
+            self.records_changed_handler = self.records_changed_async
+        if record_list is not None:
+            self.prefetcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix='FletCalendar')
+            # cached statistics of the months of added and removed records are outdated
+            record_list.add_subscriber(self.records_changed_handler, events=True)
+
+    @property
+    def is_async(self):
+        return self.async_record_list is not None
+
+    def close(self):
+        """close() method unsubscribes the calendar from the record store and stops the prefetch thread,
+        queued prefetches are cancelled, so it must be called before the record store is closed"""
+        if self.prefetcher is None:
+            return
+        (self.async_record_list or self.record_list).remove_subscriber(self.records_changed_handler)
+        prefetcher, self.prefetcher = self.prefetcher, None
+        prefetcher.shutdown(wait=True, cancel_futures=True)
 
     @staticmethod
     def get_current_date():
@@ -32,9 +88,21 @@ class FletCalendar(ft.UserControl):
         return current_day, current_month, current_year
 
     def select_date(self, e):
-        """user selected the date"""
+        """user selected the date, only the cells of the previous and the new day and the date text are updated"""
         self.selected_date = e.control.data
-        self.set_date()
+        self.current_day, self.current_month, self.current_year = self.selected_date
+        month_view = self.month_view(self.current_year, self.current_month)
+        changed = self.show_day(month_view)
+        if self.page is not None:
+            self.page.update(*changed)
+
+    async def select_date_async(self, e):
+        """select_date_async() method is select_date() in Flet's async mode"""
+        self.selected_date = e.control.data
+        self.current_day, self.current_month, self.current_year = self.selected_date
+        changed = self.show_day(self.month_view(self.current_year, self.current_month))
+        if self.page is not None:
+            await self.page.update_async(*changed)
 
     def set_current_date(self):
         """setting the calendar to the current date"""
@@ -42,13 +110,13 @@ class FletCalendar(ft.UserControl):
         self.current_month = today.month
         self.current_day = today.day
         self.current_year = today.year
-        self.build()
+        self.show_month()
         self.calendar_container.update()
 
     def set_date(self):
         """setting the calendar to the selected date"""
         self.current_day, self.current_month, self.current_year = self.selected_date
-        self.build()
+        self.show_month()
         self.calendar_container.update()
 
     def get_next(self, e):
@@ -60,9 +128,14 @@ class FletCalendar(ft.UserControl):
         self.current_year = next_month.year
         self.current_month = next_month.month
         self.current_day = next_month.day
-        self.build()
+        self.show_month()
         self.calendar_container.update()
 
+    async def get_next_async(self, e):
+        current = datetime.date(self.current_year, self.current_month, self.current_day) + relativedelta(months=1)
+        self.current_year, self.current_month, self.current_day = current.year, current.month, current.day
+        await self.show_month_async()
+
     def get_prev(self, e):
         """moving to the previous month"""
         current = datetime.date(self.current_year, self.current_month, self.current_day)
@@ -71,30 +144,199 @@ class FletCalendar(ft.UserControl):
         self.current_year = next_month.year
         self.current_month = next_month.month
         self.current_day = next_month.day
-        self.build()
+        self.show_month()
         self.calendar_container.update()
 
-    def get_calendar(self):
+    async def get_prev_async(self, e):
+        current = datetime.date(self.current_year, self.current_month, self.current_day) - relativedelta(months=1)
+        self.current_year, self.current_month, self.current_day = current.year, current.month, current.day
+        await self.show_month_async()
+
+    @staticmethod
+    def get_calendar(year, month):
         """get the calendar from the calendar module"""
         cal = HTMLCalendar()
-        return cal.monthdayscalendar(self.current_year, self.current_month)
-#
+        return cal.monthdayscalendar(year, month)
+
     def build(self):
         """build the calendar"""
-        current_calendar = self.get_calendar()
+        self.show_month()
+        return ft.Column([self.calendar_container])
+
+    async def did_mount_async(self):
+        """in Flet's async mode the displayed month is painted, when its statistics are awaited"""
+        if self.is_async:
+            await self.paint_month_async()
+
+    def show_month(self):
+        """show_month() method puts the controls of the current month into the calendar container,
+        the controls are taken from the cache of months, if the month has been displayed already"""
+        month_view = self.month_view(self.current_year, self.current_month)
+        self.show_day(month_view)
+        self.paint_month(month_view)
+        self.calendar_container.content = month_view.column
+        self.prefetch(self.current_year, self.current_month)
+
+    async def show_month_async(self):
+        """show_month_async() method is show_month() in Flet's async mode, the month is displayed at once
+        and painted, when its statistics are awaited"""
+        self.show_month()
+        await self.calendar_container.update_async()
+        await self.paint_month_async()
+
+    def show_day(self, month_view):
+        """show_day() method displays the current day in bold and the date above the grid,
+        it returns the controls, which have been changed"""
+        changed = [month_view.date_display]
+        month_view.date_display.value = '{0} {1}, {2}'.format(self.current_day,
+                                                              calendar.month_name[self.current_month],
+                                                              self.current_year)
+        if month_view.bold_day != self.current_day:
+            previous_cell = month_view.day_cells.get(month_view.bold_day)
+            if previous_cell is not None:
+                previous_cell.content.weight = ft.FontWeight.W_300
+                changed.append(previous_cell)
+            cell = month_view.day_cells[self.current_day]
+            cell.content.weight = ft.FontWeight.BOLD
+            changed.append(cell)
+            month_view.bold_day = self.current_day
+        return changed
+
+    def paint_month(self, month_view):
+        """paint_month() method colors the cells of days with entries by their average mood,
+        it returns the cells, which have been changed"""
+        if self.record_list is None:
+            return []
+        statistics = self.month_statistics(self.current_year, self.current_month)
+        if statistics is None or month_view.statistics is statistics:
+            return []
+        month_view.statistics = statistics
+        changed = []
+        for day, cell in month_view.day_cells.items():
+            color, tooltip = None, None
+            if day in statistics:
+                entries_number, average_mood = statistics[day]
+                color = self.heat_color(average_mood)
+                tooltip = 'Entries: {0}, average mood: {1}'.format(entries_number, average_mood)
+            if cell.bgcolor != color or cell.tooltip != tooltip:
+                cell.bgcolor = color
+                cell.tooltip = tooltip
+                changed.append(cell)
+        return changed
+
+    async def paint_month_async(self):
+        """paint_month_async() method awaits the statistics of the displayed month, if they aren't in the cache,
+        and colors the cells of its days"""
+        key = (self.current_year, self.current_month)
+        if key not in self.month_statistics_cache:
+            generation = self.record_list.generation
+            rows = await self.async_record_list.get_daily_statistics(*self.month_dates(*key))
+            self.cache_month_statistics(key, generation, rows)
+        changed = self.paint_month(self.month_view(self.current_year, self.current_month))
+        if changed and self.page is not None:
+            await self.page.update_async(*changed)
+
+    @staticmethod
+    def heat_color(average_mood):
+        """heat_color() method returns the color of a day with the average mood from 0 to 10"""
+        index = int(average_mood * len(HEAT_COLORS) / 10)
+        return HEAT_COLORS[max(0, min(index, len(HEAT_COLORS) - 1))]
+
+    @staticmethod
+    def month_dates(year, month):
+        """month_dates() method returns the first and the last dates of the month"""
+        return ('{0:04}-{1:02}-01'.format(year, month),
+                '{0:04}-{1:02}-{2:02}'.format(year, month, calendar.monthrange(year, month)[1]))
+
+    def month_statistics(self, year, month):
+        """month_statistics() method returns a dictionary of days of the month with entries
+        and (entries number, average mood) tuples, the statistics are read from the cache, if they are there,
+        in Flet's async mode None is returned for a month, which isn't in the cache, instead of querying the store"""
+        statistics = self.month_statistics_cache.get((year, month))
+        if statistics is None and not self.is_async:
+            statistics = self.query_month_statistics((year, month), self.record_list.generation)
+        return statistics
+
+    def query_month_statistics(self, key, generation):
+        """query_month_statistics() method reads the statistics of the month from the record store and caches them"""
+        return self.cache_month_statistics(key, generation,
+                                           self.record_list.get_daily_statistics(*self.month_dates(*key)))
+
+    def cache_month_statistics(self, key, generation, rows):
+        """cache_month_statistics() method caches the statistics of the month made of the rows of daily statistics,
+        if records haven't been changed since the generation of the store, and returns them"""
+        statistics = {int(date[8:]): (entries_number, average_mood) for date, entries_number, average_mood, *moods
+                      in rows}
+        with self.statistics_lock:
+            if generation == self.record_list.generation:
+                self.month_statistics_cache[key] = statistics
+        return statistics
+
+    def prefetch(self, year, month):
+        """prefetch() method queries statistics of the previous and the next months on the prefetch thread,
+        so they are in the cache, when user moves to them"""
+        if self.prefetcher is None:
+            return
+        first_day = datetime.date(year, month, 1)
+        for other in (first_day - relativedelta(months=1), first_day + relativedelta(months=1)):
+            key = (other.year, other.month)
+            if key not in self.month_statistics_cache:
+                self.prefetcher.submit(self.prefetch_month, key, self.record_list.generation)
+
+    def prefetch_month(self, key, generation):
+        if key not in self.month_statistics_cache:
+            self.query_month_statistics(key, generation)
+
+    def records_changed(self, event=None):
+        """records_changed() method removes the statistics of the months of added or removed records from the cache
+        and colors the displayed month again, if its statistics have been changed"""
+        self.forget_month_statistics(event)
+        if self.page is not None and (self.current_year, self.current_month) not in self.month_statistics_cache:
+            changed = self.paint_month(self.month_view(self.current_year, self.current_month))
+            if changed:
+                self.page.update(*changed)
+
+    async def records_changed_async(self, event=None):
+        """records_changed_async() method is records_changed() for an AsyncRecordListDB"""
+        self.forget_month_statistics(event)
+        if self.page is not None and (self.current_year, self.current_month) not in self.month_statistics_cache:
+            await self.paint_month_async()
+
+    def forget_month_statistics(self, event):
+        """forget_month_statistics() method removes the statistics of the months of the records of the event
+        from the cache, or all statistics, if there is no event"""
+        with self.statistics_lock:
+            if event is None:
+                self.month_statistics_cache.clear()
+            else:
+                for record in event.records:
+                    if record.day is not None:
+                        date = datetime.date.fromordinal(record.day)
+                        self.month_statistics_cache.pop((date.year, date.month), None)
+
+    def month_view(self, year, month):
+        """month_view() method returns the MonthView of the month from the cache, creating it on first use"""
+        key = (year, month)
+        month_view = self.months.get(key)
+        if month_view is None:
+            month_view = self.months[key] = self.create_month_view(year, month)
+            if len(self.months) > self.max_months:
+                self.months.popitem(last=False)
+        else:
+            self.months.move_to_end(key)
+        return month_view
 
-        str_date = '{0} {1}, {2}'.format(self.current_day,
-                                         calendar.month_name[self.current_month],
-                                         self.current_year)
+    def create_month_view(self, year, month):
+        """create_month_view() method creates the controls of the month"""
+        current_calendar = self.get_calendar(year, month)
 
-        date_display = ft.Text(str_date,
-                               text_align=ft.TextAlign.CENTER,
+        date_display = ft.Text(text_align=ft.TextAlign.CENTER,
                                size=20)
         next_button = ft.Container(ft.Text('>', text_align=ft.TextAlign.RIGHT, size=20),
-                                   on_click=self.get_next)
+                                   on_click=self.get_next_async if self.is_async else self.get_next)
         div = ft.Divider(height=1, thickness=2.0)
         prev_button = ft.Container(ft.Text('<', text_align=ft.TextAlign.LEFT, size=20),
-                                   on_click=self.get_prev)
+                                   on_click=self.get_prev_async if self.is_async else self.get_prev)
 
         calendar_column = ft.Column(
             [ft.Row([prev_button, date_display, next_button],
@@ -104,23 +346,23 @@ class FletCalendar(ft.UserControl):
                     expand=False),
              div],
             spacing=2, width=355, height=330, alignment=ft.MainAxisAlignment.START, expand=False)
+        day_cells = {}
         # loop weeks and add row
         for week in current_calendar:
             week_row = ft.Row(alignment=ft.MainAxisAlignment.CENTER)
             # Loop days and add days to row.
             for day in week:
                 if day > 0:
-                    is_current_day_font = ft.FontWeight.W_300
                     display_day = str(day)
                     if len(str(display_day)) == 1: display_day = '0%s' % display_day
-                    if day == self.current_day:
-                        is_current_day_font = ft.FontWeight.BOLD
 
                     day_button = ft.Container(
-                        content=ft.Text(str(display_day), weight=is_current_day_font),
-                        on_click=self.select_date, data=(day, self.current_month, self.current_year),
+                        content=ft.Text(str(display_day), weight=ft.FontWeight.W_300),
+                        on_click=self.select_date_async if self.is_async else self.select_date,
+                        data=(day, month, year),
                         width=40, height=40, ink=True, alignment=ft.alignment.center,
                         border_radius=ft.border_radius.all(10))
+                    day_cells[day] = day_button
                 else:
                     day_button = ft.Container(width=40, height=40, border_radius=ft.border_radius.all(10))
 
@@ -128,6 +370,4 @@ class FletCalendar(ft.UserControl):
 
             # adding the weeks to the main column
             calendar_column.controls.append(week_row)
-        # adding the column to the page container
-        self.calendar_container.content = calendar_column
-        return ft.Column([self.calendar_container])
\ No newline at end of file
+        return MonthView(calendar_column, date_display, day_cells)
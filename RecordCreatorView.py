@@ -1,6 +1,10 @@
+import asyncio
+import threading
+from collections import OrderedDict
 import flet as ft
 from flet_core import UserControl
 import FletCalendar
+from DiaryRecords import AsyncRecordListDB
 
 
 # RecordCreatorView class is an interface for creating entries in a diary
@@ -16,21 +20,22 @@ class RecordCreatorView(UserControl):
         self.mood_slider = 0
         self.list_of_symptoms = []
         self.list_of_symptoms_text = ft.Text()
-        self.data = ['Headache', 'Abdominal pain', 'Blood in stool', 'Chest pain', 'Constipation', 'Cough', 'Diarrhea',
-                     'Difficulty swallowing', 'Dizziness', 'Eye discomfort and redness', 'Eye problems', 'Foot pain',
-                     'ankle pain', 'Foot swelling', 'leg swelling', 'Heart palpitations', 'Hip pain', 'Knee pain',
-                     'Low back pain', 'Nasal congestion', 'Nausea or vomiting', 'Neck pain', 'Numbness', 'Tingling in hands',
-                     'Pelvic pain', 'Shortness of breath', 'Shoulder pain', 'Sore throat', 'Urinary problems', 'Wheezing',
-                     'Blurred vision', 'Brain fog', 'Choking when eating', 'Crossed eyed', 'Decreased responsiveness',
-                     'Difficult to swallow', 'Difficulty speaking', 'Difficulty walking', 'Difficulty writing',
-                     'Drooling from one side of the mouth', 'Alteration in mental status', 'Drooping eyelids',
-                     'Face or mouth numbness', 'Fine tremors in hands', 'Lost interest in people', 'Limb spasms',
-                     'Limb weakness', 'Seizure', 'Sensitive to sound', 'Sensitive to light', 'Stuttering', 'Tics',
-                     'Trembling of fingers or whole body', 'Hangover', 'Eye twitching', 'Double vision']
+        self.recordlist = recordlist
+        # symptoms are found in the catalog of symptoms of the record store, a typed symptom, which isn't
+        # in the catalog, is offered too and is added to the catalog, when user adds it to the entry
+        self.is_async = isinstance(recordlist, AsyncRecordListDB)
         self.txtsearch = ft.TextField(label='Search',
                                       text_size=20,
-                                      on_change=self.search)
+                                      on_change=self.search_async if self.is_async else self.search)
         self.resultdata = ft.ListView()
+        # searching starts after user stops typing for search_delay seconds, the rows of found symptoms
+        # are kept in the pool by symptoms and reused by the next searches
+        self.search_delay = 0.15
+        self.search_timer = None
+        self.search_task = None
+        self.result_rows = OrderedDict()
+        self.pool_size = 100
+        self.result_shown = False
 
         self.resultcon = ft.Container(
             padding=10,
@@ -40,11 +45,22 @@ class RecordCreatorView(UserControl):
             content=ft.Column(controls=[
                 self.resultdata]))
         self.resultcon.visible = False
-        self.recordlist = recordlist
 
     def create_button_clicked(self, e):
         """method create_button_clicked() collects all user input
          and initiates creating a record by calling add_record() method of the RecordList class"""
+        self.recordlist.add_record(*self.record_fields())
+        self.list_of_symptoms = []
+
+    async def create_button_clicked_async(self, e):
+        """method create_button_clicked_async() is create_button_clicked() for an AsyncRecordListDB,
+        the record is written on the thread of the database, while the event loop keeps serving the page"""
+        fields = self.record_fields()
+        self.list_of_symptoms = []
+        await self.recordlist.add_record(*fields)
+
+    def record_fields(self):
+        """method record_fields() returns title, text, mood, symptoms and date of the record entered by user"""
         if not self.calendar.selected_date:
             (day, month, year) = FletCalendar.FletCalendar.get_current_date()
         else:
@@ -55,62 +71,132 @@ class RecordCreatorView(UserControl):
             month = '0%s' % str(month)
         year = str(year)
         record_date = '{}-{}-{}'.format(year, month, day)
-        self.recordlist.add_record(
-            self.title_field.value,
-            self.text_field.value,
-            self.mood_slider,
-            ','.join(self.list_of_symptoms),
-            record_date)
-        self.list_of_symptoms = []
+        return (self.title_field.value,
+                self.text_field.value,
+                self.mood_slider,
+                ','.join(self.list_of_symptoms),
+                record_date)
+
+    def create_button_handler(self):
+        if self.is_async:
+            return self.create_button_clicked_async
+        return self.create_button_clicked
 
     def slider_changed(self, e):
         self.mood_slider = e.control.value
         self.update()
 
+    async def slider_changed_async(self, e):
+        self.mood_slider = e.control.value
+        await self.update_async()
+
     def create_resultdata_view(self, x):
         # creating an interface for adding symptom to the users's list if symptoms or removing it from the list
         icon_button = ft.IconButton(
             icon=ft.icons.ADD_CIRCLE_OUTLINE,
             icon_size=20,
             tooltip="Add/remove symptom",
-            selected_icon=ft.icons.DONE_OUTLINE_ROUNDED)
-
-        def icon_button_clicked(e):
-            symptom = x
-            if e.control.selected:
-                self.remove_symptom(symptom)
-                e.control.selected = False
-                e.control.update()
-            else:
-                self.add_symptom(symptom)
-                e.control.selected = True
-                e.control.update()
-
-        icon_button.on_click = icon_button_clicked
+            selected_icon=ft.icons.DONE_OUTLINE_ROUNDED,
+            selected=x in self.list_of_symptoms,
+            data=x,
+            on_click=self.icon_button_clicked_async if self.is_async else self.icon_button_clicked)
         view = ft.Row(controls=[
             ft.Text(x, size=20),
             icon_button])
         return view
 
+    def icon_button_clicked(self, e):
+        symptom = e.control.data
+        if e.control.selected:
+            self.remove_symptom(symptom)
+            e.control.selected = False
+            e.control.update()
+        else:
+            self.add_symptom(symptom)
+            e.control.selected = True
+            e.control.update()
+            # the symptom typed by user is saved in the catalog, the catalog ignores the symptoms it has
+            self.recordlist.add_symptom_terms([symptom])
+
+    async def icon_button_clicked_async(self, e):
+        symptom = e.control.data
+        if e.control.selected:
+            self.remove_symptom(symptom)
+            e.control.selected = False
+            await e.control.update_async()
+        else:
+            self.add_symptom(symptom)
+            e.control.selected = True
+            await e.control.update_async()
+            await self.recordlist.add_symptom_terms([symptom])
+
     def search(self, e):
-        """the search among the available list of symptoms"""
-        mysearch = e.control.value
+        """the search among the symptoms of the catalog starts, when user stops typing for search_delay seconds"""
+        if self.search_timer is not None:
+            self.search_timer.cancel()
+        self.search_timer = threading.Timer(self.search_delay, self.show_symptoms, (e.control.value,))
+        self.search_timer.daemon = True
+        self.search_timer.start()
+
+    def show_symptoms(self, mysearch):
+        # the search, which has been started before the last change of the search field, is outdated
+        if mysearch != self.txtsearch.value:
+            return
         result = []
-        if not mysearch == '':
-            self.resultcon.visible = True
-            for item in self.data:
-                if mysearch in item:
-                    result.append(item)
-        if len(result) > 0:
-            self.resultcon.offset = ft.transform.Offset(0, 0)
-            self.resultdata.controls.clear()
-            for x in result:
-                self.resultdata.controls.append(self.create_resultdata_view(x))
-            self.update()
-        else:
-            self.resultcon.offset = ft.transform.Offset(-2, 0)
-            self.resultdata.controls.clear()
-            self.update()
+        if not mysearch.strip() == '':
+            result = self.recordlist.search_symptoms(mysearch)
+        if self.show_result(mysearch, result):
+            self.resultcon.update()
+
+    async def search_async(self, e):
+        if self.search_task is not None:
+            self.search_task.cancel()
+        self.search_task = asyncio.ensure_future(self.show_symptoms_async(e.control.value))
+
+    async def show_symptoms_async(self, mysearch):
+        await asyncio.sleep(self.search_delay)
+        result = []
+        if not mysearch.strip() == '':
+            result = await self.recordlist.search_symptoms(mysearch)
+        if self.show_result(mysearch, result):
+            await self.resultcon.update_async()
+
+    def show_result(self, mysearch, result):
+        """show_result() method displays the found symptoms, and the typed symptom, if it isn't among them,
+        rows of symptoms are taken from the pool of rows, so rows displayed already aren't sent to the page again,
+        it returns True if the displayed rows or their selected state have changed"""
+        mysearch = ' '.join(mysearch.split())
+        changed = False
+        if mysearch != '':
+            if not self.resultcon.visible:
+                self.resultcon.visible = changed = True
+            if mysearch.casefold() not in (x.casefold() for x in result):
+                result = result + [mysearch]
+        rows = []
+        for x in result:
+            row = self.result_rows.get(x)
+            if row is None:
+                row = self.result_rows[x] = self.create_resultdata_view(x)
+            else:
+                self.result_rows.move_to_end(x)
+            # the selected state follows the list of symptoms of the entry
+            icon_button = row.controls[1]
+            if icon_button.selected != (x in self.list_of_symptoms):
+                icon_button.selected = x in self.list_of_symptoms
+                changed = True
+            rows.append(row)
+        # the rows, which have been displayed least recently, leave the pool
+        while len(self.result_rows) > self.pool_size:
+            self.result_rows.popitem(last=False)
+        if rows != self.resultdata.controls:
+            self.resultdata.controls = rows
+            changed = True
+        shown = len(rows) > 0
+        if shown != self.result_shown:
+            self.result_shown = shown
+            self.resultcon.offset = ft.transform.Offset(0, 0) if shown else ft.transform.Offset(-2, 0)
+            changed = True
+        return changed
 
     def add_symptom(self, x):
         if x not in self.list_of_symptoms:
@@ -127,12 +213,12 @@ class RecordCreatorView(UserControl):
                                    expand=True,
                                    width=355,
 
-                                   on_click=self.create_button_clicked)
+                                   on_click=self.create_button_handler())
         slider = ft.Slider(min=0,
                            max=10,
                            divisions=10,
                            label="{value}",
-                           on_change_end=self.slider_changed)
+                           on_change_end=self.slider_changed_async if self.is_async else self.slider_changed)
         text_slider = ft.Text(
             '''Use the slider to pick a number from 1 to 10 that best reflects your mood level.''',
             size=15)
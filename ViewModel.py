@@ -1,13 +1,13 @@
 import flet as ft
 from flet_core import UserControl
-from DiaryViews import RecordListView, DateSelectionView, StatisticsView
-from DiaryRecords import Analytics
+from DiaryViews import BatchedUpdates, RecordListView, DateSelectionView, StatisticsView
+from DiaryRecords import Analytics, AsyncRecordListDB, RecordCache, RecordEvent, day_ordinal
 
 
 # ViewModel class is an integral component of the Model-View-ViewModel design pattern,
 # serving as a controller responsible for generating and modifying UI elements in the View
-# based on user-triggered events
-class ViewModel(UserControl):
+# based on user-triggered events, changes of the views made by an event are sent to the page with a single update
+class ViewModel(BatchedUpdates, UserControl):
     def __init__(self,
                  record_list,
                  date_selection_view=False,
@@ -15,10 +15,30 @@ class ViewModel(UserControl):
                  summary_view=False):
         super().__init__()
         self.record_list = record_list
+        # with an AsyncRecordListDB the views are updated by async handlers, which await the queries,
+        # so the event loop of Flet's async mode keeps rendering while the database is working
+        self.is_async = isinstance(record_list, AsyncRecordListDB)
+        if self.is_async:
+            self.date_selected_handler = self.new_date_selected_async
+            self.search_handler = self.search_submitted_async
+            self.delete_record_handler = self.delete_record_async
+            self.record_list_updated_handler = self.record_list_updated_async
+            self.list_scrolled_handler = self.list_scrolled_async
+        else:
+            self.date_selected_handler = self.new_date_selected
+            self.search_handler = self.search_submitted
+            self.delete_record_handler = self.delete_record
+            self.record_list_updated_handler = self.record_list_updated
+            self.list_scrolled_handler = self.list_scrolled
+        # queries for displaying views go through the cache, so views of the same period
+        # don't query the record store again until records are changed
+        self.record_cache = RecordCache(record_list)
         self.list_view = ft.ListView(expand=1,
                                      auto_scroll=False,
                                      spacing=10,
-                                     padding=10)
+                                     padding=10,
+                                     on_scroll_interval=100,
+                                     on_scroll=self.list_scrolled_handler)
         self.view = ft.Container(expand=True,
                                  border_radius=10,
                                  alignment=ft.alignment.top_center,)
@@ -31,102 +51,245 @@ class ViewModel(UserControl):
         # associated with selection of a new date or switching the view between the list of entries and the summary view
         if date_selection_view:
             self.date = True
-            self.date_selection_view = DateSelectionView()
-            self.date_selection_view.add_subscriber(self.new_date_selected)
-        # create summary view (if True)
+            self.date_selection_view = DateSelectionView(self.is_async)
+            self.date_selection_view.add_subscriber(self.date_selected_handler)
+        # create summary view (if True), the summary view is created, when it is displayed for the first time,
+        # and records are queried only for the displayed view, after it is mounted
+        self.summary_view = None
         if summary_view:
             self.sum = True
             self.displayed_view = 'stat'
-            self.summary_view = StatisticsView()
-            records = self.record_list.get_records()
-            records_number = len(records)
-            self.summary_view.entries_number = records_number
-            mood = Analytics.average_mood(records)
-            self.summary_view.average_mood = mood
-            symptoms = Analytics.symptoms(records)
-            self.summary_view.symptoms = symptoms
         # create list of entries view (if True) and subscribe instance of ViewModel class to notifications
         # associated with deleting a record, triggered by user
         if record_list_view:
             self.list = True
             self.displayed_view = 'ent'
-            list_of_entries = self.record_list.get_records()
-            self.record_list_view = RecordListView()
-            self.record_list_view.value = list_of_entries
-            self.record_list_view.add_subscriber(self.delete_record)
-        # subscribe instance of ViewModel class to notifications associated with any changes in the list of records
-        self.record_list.add_subscriber(self.record_list_updated)
+            self.record_list_view = RecordListView(is_async=self.is_async)
+            self.record_list_view.add_subscriber(self.delete_record_handler)
+            # the search box filters the list of entries by the words of titles and texts,
+            # the found entries of the selected period are displayed from the most relevant one
+            self.search_field = ft.TextField(label='Search entries',
+                                             text_size=15,
+                                             on_submit=self.search_handler)
+        # subscribe instance of ViewModel class to notifications associated with any changes in the list of records,
+        # the notifications describe added and removed records to update the views incrementally
+        self.record_list.add_subscriber(self.record_list_updated_handler, events=True)
         self.new_date = None
+        self.search_query = ''
+        self.search_limit = 100
 
     def build(self):
         if self.date_selection_view:
             self.list_view.controls.append(self.date_selection_view)
         if self.list:
+            self.list_view.controls.append(self.search_field)
             if self.list and self.displayed_view == 'ent':
                 self.list_view.controls.append(self.record_list_view)
             if self.sum and self.displayed_view == 'stat':
-                self.list_view.controls.append(self.summary_view)
+                self.list_view.controls.append(self.get_summary_view())
         self.view.content = self.list_view
         return self.view
 
     def did_mount(self):
         """update views right after building them"""
-        if self.list and self.displayed_view == 'ent':
-            self.update_record_list_view()
-        if self.sum and self.displayed_view == 'stat':
-            self.update_summary_view()
-        self.update()
+        if self.is_async:
+            return
+        with self.batch(*self.data_views()):
+            if self.list and self.displayed_view == 'ent':
+                self.update_record_list_view()
+            if self.sum and self.displayed_view == 'stat':
+                self.update_summary_view()
+            self.update()
 
-    def record_list_updated(self):
-        if self.list and self.displayed_view == 'ent':
-            self.update_record_list_view()
-        if self.sum and self.displayed_view == 'stat':
-            self.update_summary_view()
-        self.update()
+    async def did_mount_async(self):
+        """in Flet's async mode views of an AsyncRecordListDB are loaded right after building them"""
+        if not self.is_async:
+            self.did_mount()
+            return
+        async with self.batch_async(*self.data_views()):
+            if self.list and self.displayed_view == 'ent':
+                await self.update_record_list_view_async()
+            if self.sum and self.displayed_view == 'stat':
+                await self.update_summary_view_async()
+            await self.update_async()
 
-    def new_date_selected(self):
-        self.new_date = self.date_selection_view.selected_date
-        self.displayed_view = self.date_selection_view.button
-        if self.list:
-            if self.summary_view in self.list_view.controls:
-                self.list_view.controls.remove(self.summary_view)
-            if self.record_list_view in self.list_view.controls:
-                self.list_view.controls.remove(self.record_list_view)
-            self.update()
+    def record_list_updated(self, event=None):
+        """record_list_updated() method updates the displayed view after a change in the record store,
+        records added or removed in the selected period are patched into the list of entries,
+        changes outside of the selected period don't update the views, the views are loaded
+        when they are mounted, if the ViewModel isn't on a page yet"""
+        if self.page is None:
+            return
+        records = self.records_in_selected_period(event) if event is not None else None
+        if records is not None and len(records) == 0:
+            return
+        with self.batch(*self.data_views()):
+            if self.list and self.displayed_view == 'ent':
+                if records is not None and not self.search_query:
+                    self.patch_record_list_view(event, records)
+                else:
+                    self.update_record_list_view()
             if self.sum and self.displayed_view == 'stat':
-                self.list_view.controls.append(self.summary_view)
-                self.update()
                 self.update_summary_view()
-            else:
-                self.list_view.controls.append(self.record_list_view)
+            self.update()
+
+    async def record_list_updated_async(self, event=None):
+        """record_list_updated_async() method is record_list_updated() for an AsyncRecordListDB"""
+        if self.page is None:
+            return
+        records = self.records_in_selected_period(event) if event is not None else None
+        if records is not None and len(records) == 0:
+            return
+        async with self.batch_async(*self.data_views()):
+            if self.list and self.displayed_view == 'ent':
+                if records is not None and not self.search_query:
+                    self.patch_record_list_view(event, records)
+                else:
+                    await self.update_record_list_view_async()
+            if self.sum and self.displayed_view == 'stat':
+                await self.update_summary_view_async()
+            await self.update_async()
+
+    def records_in_selected_period(self, event):
+        return [record for record in event.records if self.in_selected_period(record)]
+
+    def patch_record_list_view(self, event, records):
+        with self.record_list_view.batch():
+            if event.kind != RecordEvent.ADDED:
+                self.record_list_view.remove_records(records)
+            if event.kind != RecordEvent.REMOVED:
+                self.record_list_view.insert_records(records)
+
+    def new_date_selected(self):
+        """new_date_selected() method updates the data of the view selected in the date selection view,
+        then swaps the displayed view and sends all changes to the page with a single update"""
+        if self.list:
+            self.new_date = self.date_selection_view.selected_date
+            self.displayed_view = self.date_selection_view.button
+            with self.batch(*self.data_views()):
+                if self.sum and self.displayed_view == 'stat':
+                    self.update_summary_view()
+                else:
+                    self.update_record_list_view()
+                self.show_selected_view()
                 self.update()
-                self.update_record_list_view()
-        self.update()
 
-    def update_record_list_view(self):
-        if self.new_date is None:
-            list_of_entries = self.record_list.get_records()
+    async def new_date_selected_async(self):
+        """new_date_selected_async() method is new_date_selected() for an AsyncRecordListDB"""
+        if self.list:
+            self.new_date = self.date_selection_view.selected_date
+            self.displayed_view = self.date_selection_view.button
+            async with self.batch_async(*self.data_views()):
+                if self.sum and self.displayed_view == 'stat':
+                    await self.update_summary_view_async()
+                else:
+                    await self.update_record_list_view_async()
+                self.show_selected_view()
+                await self.update_async()
+
+    def data_views(self):
+        """data_views() method returns the created views of records, their updates made by an event
+        are sent by the update of the ViewModel"""
+        views = [self.summary_view]
+        if self.list:
+            views.append(self.record_list_view)
+        return [view for view in views if view is not None]
+
+    def show_selected_view(self):
+        """show_selected_view() method puts the displayed view into the displayed controls instead of the other one"""
+        if self.sum and self.displayed_view == 'stat':
+            shown_view, hidden_view = self.get_summary_view(), self.record_list_view
         else:
-            start_date = self.new_date[0]
-            end_date = self.new_date[1]
-            list_of_entries = []
-            for record in self.record_list.get_records_between_dates(start_date, end_date):
-                list_of_entries.append(record)
-        self.record_list_view.value = list_of_entries
+            shown_view, hidden_view = self.record_list_view, self.summary_view
+        if hidden_view is not None and hidden_view in self.list_view.controls:
+            self.list_view.controls.remove(hidden_view)
+        if shown_view not in self.list_view.controls:
+            self.list_view.controls.append(shown_view)
 
-    def update_summary_view(self):
+    def search_submitted(self, e):
+        """search_submitted() method displays the entries found by the query typed into the search box,
+        or all entries of the selected period, if the search box is empty"""
+        self.search_query = self.search_field.value.strip()
+        if self.list and self.displayed_view == 'ent':
+            self.update_record_list_view()
+
+    async def search_submitted_async(self, e):
+        """search_submitted_async() method is search_submitted() for an AsyncRecordListDB,
+        the found entries are sent to the page by the update of the ViewModel"""
+        self.search_query = self.search_field.value.strip()
+        if self.list and self.displayed_view == 'ent':
+            async with self.batch_async(*self.data_views()):
+                await self.update_record_list_view_async()
+                await self.update_async()
+
+    def get_summary_view(self):
+        """get_summary_view() method returns the summary view, creating it on first use"""
+        if self.summary_view is None:
+            self.summary_view = StatisticsView()
+        return self.summary_view
+
+    def list_scrolled(self, e):
+        """the list of entries is a part of the scrolled view, so scrolling moves the window of displayed entries"""
+        if self.list and self.displayed_view == 'ent':
+            self.record_list_view.list_scrolled(e)
+
+    async def list_scrolled_async(self, e):
+        if self.list and self.displayed_view == 'ent':
+            await self.record_list_view.list_scrolled_async(e)
+
+    def in_selected_period(self, record):
+        """in_selected_period() method checks whether the record is in the period selected by user"""
         if self.new_date is None:
-            records = self.record_list.get_records()
-        else:
-            start_date = self.new_date[0]
-            end_date = self.new_date[1]
-            records = self.record_list.get_records_between_dates(start_date, end_date)
-        records_number = len(records)
-        mood = Analytics.average_mood(records)
-        symptoms = Analytics.symptoms(records)
-        self.summary_view.entries_number = records_number
-        self.summary_view.average_mood = mood
-        self.summary_view.symptoms = symptoms
+            return True
+        return record.day is not None and day_ordinal(self.new_date[0]) <= record.day <= day_ordinal(self.new_date[1])
+
+    def selected_period(self):
+        """selected_period() method returns start and end dates selected by user, or None, None"""
+        if self.new_date is None:
+            return None, None
+        return self.new_date[0], self.new_date[1]
+
+    def update_record_list_view(self):
+        """the entries are read from the record store page by page, while the list of entries is scrolled"""
+        start_date, end_date = self.selected_period()
+        if self.search_query:
+            self.record_list_view.source = self.record_cache.search(self.search_query, start_date, end_date,
+                                                                    self.search_limit)
+            return
+        self.record_list_view.source = self.record_cache.iter_records(start_date, end_date,
+                                                                      page_size=self.record_list_view.page_size)
+
+    async def update_record_list_view_async(self):
+        """the first window of entries is awaited from the AsyncRecordListDB,
+        the following pages are awaited page by page by the scroll handler of the list of entries"""
+        start_date, end_date = self.selected_period()
+        if self.search_query:
+            found = await self.record_list.search(self.search_query, start_date, end_date, self.search_limit)
+            self.record_list_view.next_page = None
+            self.record_list_view.source = found
+            return
+        page_size = self.record_list_view.page_size
+        number = self.record_list_view.window_size + page_size
+        page = await self.record_list.get_page(start_date, end_date, number)
+        next_page = None
+        if len(page) == number:
+            async def next_page(after):
+                return await self.record_list.get_page(start_date, end_date, page_size, after)
+        self.record_list_view.next_page = next_page
+        self.record_list_view.source = page
+
+    def update_summary_view(self):
+        self.show_summary(self.record_cache.summarize(*self.selected_period()))
+
+    async def update_summary_view_async(self):
+        self.show_summary(await self.record_list.summarize(*self.selected_period()))
+
+    def show_summary(self, summary):
+        summary_view = self.get_summary_view()
+        with summary_view.batch():
+            summary_view.entries_number = summary.entries_number
+            summary_view.average_mood = summary.average_mood
+            summary_view.symptoms = Analytics.symptoms_text(summary.symptoms)
 
     def delete_record(self, record):
         """after receiving notification from the record_list_view,
@@ -134,9 +297,12 @@ class ViewModel(UserControl):
         to finally remove the record from the record store"""
         self.record_list.remove_record(record)
 
+    async def delete_record_async(self, record):
+        await self.record_list.remove_record(record)
+
     def __del__(self):
-        self.record_list.remove_subscriber(self.record_list_updated)
+        self.record_list.remove_subscriber(self.record_list_updated_handler)
         if self.date:
-            self.date_selection_view.remove_subscriber(self.new_date_selected)
+            self.date_selection_view.remove_subscriber(self.date_selected_handler)
         if self.list:
-            self.record_list_view.remove_subscriber(self.delete_record)
\ No newline at end of file
+            self.record_list_view.remove_subscriber(self.delete_record_handler)
\ No newline at end of file
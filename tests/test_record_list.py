@@ -1,5 +1,17 @@
 import unittest
-from DiaryRecords import RecordList, Record
+from DiaryRecords import RecordList, Record, FenwickTree, ColumnarRecordList, RecordEvent, SymptomCatalog
+
+
+class TestRecord(unittest.TestCase):
+    def test_record_day(self):
+        record = Record(1, 'record', 'text', 6, 'pain', '2023-09-21')
+        self.assertEqual(record.date, '2023-09-21')
+        self.assertEqual(record.day, 738784)
+        self.assertFalse(hasattr(record, '__dict__'))
+
+    def test_record_wrong_date(self):
+        record = Record(1, 'record', 'text', 6, 'pain', 'yesterday')
+        self.assertIsNone(record.day)
 
 
 class TestAddRecord(unittest.TestCase):
@@ -26,6 +38,45 @@ class TestAddRecord(unittest.TestCase):
         self.assertEqual(record.date, '2023-09-21')
 
 
+class TestAddRecords(unittest.TestCase):
+    def test_add_records(self):
+        lst = RecordList()
+        count = 0
+
+        def foo():
+            nonlocal count
+            count += 1
+
+        lst.add_subscriber(foo)
+        lst.add_records(('record%s' % x, 'text', 6, 'pain', '2023-09-21') for x in range(3))
+        self.assertEqual([record.title for record in lst.Records], ['record0', 'record1', 'record2'])
+        self.assertEqual(len({record.record_id for record in lst.Records}), 3)
+        self.assertEqual(count, 1, "Subscribers weren't notified once!")
+
+
+class TestLargeAddRecords(unittest.TestCase):
+    def test_event_of_large_add_records(self):
+        for lst in (RecordList(), ColumnarRecordList()):
+            events = []
+            lst.add_subscriber(events.append, events=True)
+            lst.max_event_records = 2
+            lst.add_records(('record%s' % x, 'text', 6, 'pain', '2023-09-21') for x in range(2))
+            lst.add_records(('record%s' % x, 'text', 6, 'pain', '2023-09-21') for x in range(3))
+            self.assertEqual(len(events[0].records), 2)
+            self.assertIsNone(events[1])
+            self.assertEqual(lst.count_between_dates(), 5)
+
+
+class TestRecordIds(unittest.TestCase):
+    def test_ids_are_not_reused(self):
+        lst = RecordList()
+        lst.add_record('record1', 'text', 6, 'pain', '2023-09-21')
+        lst.add_record('record2', 'text', 6, 'pain', '2023-09-21')
+        lst.remove_record(lst.Records[1])
+        lst.add_record('record3', 'text', 6, 'pain', '2023-09-21')
+        self.assertEqual([record.record_id for record in lst.Records], [1, 3])
+
+
 class TestRemoveRecord(unittest.TestCase):
     def test_remove_record_in_list(self):
         lst = RecordList()
@@ -42,6 +93,17 @@ class TestRemoveRecord(unittest.TestCase):
         except ValueError:
             self.fail('The ValueError was raised')
 
+    def test_remove_stale_record(self):
+        lst = RecordList()
+        lst.add_record('record1', 'text', 4, 'pain', '2023-01-01')
+        lst.add_record('record2', 'text', 8, 'pain', '2023-06-01')
+        lst.remove_record(Record(1, 'record1', 'text', 4, 'pain', '2023-06-01'))
+        self.assertEqual([record.title for record in lst.get_records_between_dates('2023-06-01', '2023-06-30')],
+                         ['record2'])
+        self.assertEqual(lst.get_records_between_dates('2023-01-01', '2023-01-31'), [])
+        self.assertEqual(lst.average_mood_between_dates(), 8)
+        self.assertEqual(lst.count_between_dates(), 1)
+
 
 class TestAddSubscriber(unittest.TestCase):
     def test_add_subscriber(self):
@@ -101,8 +163,268 @@ class TestGetRecordsBetweenDates(unittest.TestCase):
         self.assertNotEqual(records[1].date, '2023-09-21')
         self.assertNotEqual(records[2].date, '2023-09-21')
 
+    def test_get_records_between_dates_sorted_by_date(self):
+        lst = RecordList()
+        lst.add_record('record1', 'text', 6, 'pain', '2023-09-23')
+        lst.add_record('record2', 'text', 6, 'pain', '2023-09-21')
+        lst.add_record('record3', 'text', 6, 'pain', '2023-09-22')
+        lst.add_record('record4', 'text', 6, 'pain', '2023-09-21')
+        records = lst.get_records_between_dates('2023-09-21', '2023-09-22')
+        self.assertEqual([record.title for record in records], ['record2', 'record4', 'record3'])
+
+
+class TestIterRecords(unittest.TestCase):
+    def test_iter_records(self):
+        lst = RecordList()
+        lst.add_record('record1', 'text', 6, 'pain', '2023-09-22')
+        lst.add_record('record2', 'text', 6, 'pain', '2023-09-21')
+        lst.add_record('record3', 'text', 6, 'pain', '2023-09-22')
+        records = list(lst.iter_records())
+        self.assertEqual([record.title for record in records], ['record3', 'record1', 'record2'])
+        records = list(lst.iter_records('2023-09-22', '2023-09-22', after=records[0]))
+        self.assertEqual([record.title for record in records], ['record1'])
+
+
+class TestSummarize(unittest.TestCase):
+    def test_summarize(self):
+        lst = RecordList()
+        lst.add_record('record1', 'text', 6, 'pain,cough', '2023-09-21')
+        lst.add_record('record2', 'text', 3, 'pain', '2023-09-22')
+        lst.add_record('record3', 'text', 9, '', '2023-09-23')
+        summary = lst.summarize('2023-09-21', '2023-09-22')
+        self.assertEqual(summary.entries_number, 2)
+        self.assertEqual(summary.average_mood, 4.5)
+        self.assertEqual(summary.symptoms, {'pain': 2, 'cough': 1})
+        self.assertEqual(lst.summarize().entries_number, 3)
+
+    def test_summarize_no_records(self):
+        summary = RecordList().summarize()
+        self.assertEqual(summary.entries_number, 0)
+        self.assertEqual(summary.average_mood, 0)
+        self.assertEqual(summary.symptoms, {})
+
+
+class TestGetRecordsWithSymptom(unittest.TestCase):
+    def test_get_records_with_symptom(self):
+        lst = RecordList()
+        lst.add_record('record1', 'text', 6, 'pain,cough', '2023-09-21')
+        lst.add_record('record2', 'text', 3, 'back pain', '2023-09-22')
+        lst.add_record('record3', 'text', 9, 'pain', '2023-09-23')
+        records = lst.get_records_with_symptom('pain', '2023-09-20', '2023-09-22')
+        self.assertEqual([record.title for record in records], ['record1'])
+
+
+class TestSearch(unittest.TestCase):
+    def setUp(self):
+        self.lst = RecordList()
+        self.lst.add_record('Headache', 'Bad headache after work', 4, '', '2023-09-21')
+        self.lst.add_record('Walk', 'Long walk, no headache', 8, '', '2023-09-22')
+        self.lst.add_record('Work', 'Busy day at work', 6, '', '2023-09-23')
+
+    def test_search_ranks_records(self):
+        records = self.lst.search('headache')
+        self.assertEqual([record.title for record in records], ['Headache', 'Walk'])
+
+    def test_search_all_words(self):
+        self.assertEqual([record.title for record in self.lst.search('WORK headache')], ['Headache'])
+
+    def test_search_prefix(self):
+        self.assertEqual([record.title for record in self.lst.search('bus')], ['Work'])
+
+    def test_search_between_dates(self):
+        records = self.lst.search('headache', '2023-09-22', '2023-09-23')
+        self.assertEqual([record.title for record in records], ['Walk'])
+
+    def test_search_limit(self):
+        self.assertEqual(len(self.lst.search('headache', limit=1)), 1)
 
+    def test_search_removed_record(self):
+        self.lst.remove_record(self.lst.search('busy')[0])
+        self.assertEqual(self.lst.search('busy'), [])
+        self.assertNotIn('busy', self.lst.text_index)
+
+    def test_empty_query(self):
+        self.assertEqual(self.lst.search(' , '), [])
+
+
+class TestSymptomCatalog(unittest.TestCase):
+    def setUp(self):
+        self.catalog = SymptomCatalog(['Headache', 'Low back pain', 'Hip pain', 'Neck pain', 'Heart palpitations',
+                                       'Difficulty swallowing'])
+
+    def test_search_is_case_insensitive(self):
+        self.assertEqual(self.catalog.search('HEADACHE'), ['Headache'])
+
+    def test_search_ranks_prefix_word_and_substring_matches(self):
+        self.assertEqual(self.catalog.search('pa'), ['Hip pain', 'Neck pain', 'Low back pain', 'Heart palpitations'])
+        self.assertEqual(self.catalog.search('wallow'), ['Difficulty swallowing'])
+
+    def test_search_several_words(self):
+        self.assertEqual(self.catalog.search('back  pain'), ['Low back pain'])
+
+    def test_search_mistyped_term(self):
+        self.assertEqual(self.catalog.search('hedache'), ['Headache'])
+
+    def test_search_limit(self):
+        self.assertEqual(self.catalog.search('pain', limit=2), ['Hip pain', 'Neck pain'])
+
+    def test_add_term(self):
+        self.assertTrue(self.catalog.add_term('Jaw pain'))
+        self.assertFalse(self.catalog.add_term('jaw PAIN '))
+        self.assertIn('JAW PAIN', self.catalog)
+        self.assertEqual(self.catalog.search('jaw'), ['Jaw pain'])
+
+    def test_add_terms(self):
+        terms = ['Jaw pain', 'jaw PAIN ', 'Ear pain', '']
+        self.catalog.add_terms(terms)
+        catalog = SymptomCatalog(['Headache', 'Low back pain', 'Hip pain', 'Neck pain', 'Heart palpitations',
+                                  'Difficulty swallowing'])
+        for term in terms:
+            catalog.add_term(term)
+        self.assertEqual(self.catalog.words, catalog.words)
+        self.assertEqual(self.catalog.search('pain'), catalog.search('pain'))
+
+    def test_record_list_catalog(self):
+        lst = RecordList()
+        lst.add_symptom_terms(['Jaw pain'])
+        self.assertEqual(lst.search_symptoms('jaw'), ['Jaw pain'])
+        self.assertEqual(lst.search_symptoms('headache'), ['Headache'])
+
+
+class TestFenwickTree(unittest.TestCase):
+    def test_range_sum(self):
+        tree = FenwickTree(1000)
+        values = {3: 5, 10: 2, 11: 7, 999: 1, 1000: 4}
+        for position, value in values.items():
+            tree.add(position, value)
+        tree.add(10, -2)
+        self.assertEqual(tree.range_sum(1, 1000), 17)
+        self.assertEqual(tree.range_sum(4, 11), 7)
+        self.assertEqual(tree.range_sum(10, 10), 0)
+        self.assertEqual(tree.range_sum(999, 1000), 5)
+
+
+class TestStatisticsBetweenDates(unittest.TestCase):
+    def test_statistics_between_dates(self):
+        lst = RecordList()
+        lst.add_record('record1', 'text', 6, 'pain', '2023-09-21')
+        lst.add_record('record2', 'text', 3, 'pain', '2023-09-22')
+        lst.add_record('record3', 'text', 9, 'pain', '2023-09-23')
+        lst.add_record('record4', 'text', 2, 'pain', '2023-10-01')
+        self.assertEqual(lst.count_between_dates('2023-09-22', '2023-10-01'), 3)
+        self.assertEqual(lst.average_mood_between_dates('2023-09-21', '2023-09-23'), 6)
+        lst.remove_record(lst.Records[2])
+        self.assertEqual(lst.count_between_dates('2023-09-22', '2023-10-01'), 2)
+        self.assertEqual(lst.average_mood_between_dates('2023-09-21', '2023-09-23'), 4.5)
+        self.assertEqual(lst.average_mood_between_dates('2023-08-01', '2023-08-31'), 0)
+
+
+class TestGetDailyStatistics(unittest.TestCase):
+    def test_get_daily_statistics(self):
+        lst = RecordList()
+        lst.add_records([('record1', 'text', 4, '', '2023-09-21'),
+                         ('record2', 'text', 8, '', '2023-09-21'),
+                         ('record3', 'text', 5, '', '2023-09-23'),
+                         ('record4', 'text', 5, '', '2023-10-01')])
+        self.assertEqual(lst.get_daily_statistics('2023-09-01', '2023-09-30'),
+                         [('2023-09-21', 2, 6, 4, 8), ('2023-09-23', 1, 5, 5, 5)])
+
+
+class TestColumnarRecordList(unittest.TestCase):
+    def setUp(self):
+        self.lst = ColumnarRecordList()
+        self.expected = RecordList()
+        records = [('record%s' % x, 'text ü%s' % x, x % 10 + 1, 'pain,cough' if x % 3 else 'fever',
+                    '2023-09-%02d' % (x * 7 % 30 + 1)) for x in range(60)]
+        self.lst.add_records(records)
+        self.expected.add_records(records)
+        for record in self.expected.get_records()[::4]:
+            self.lst.remove_record(record)
+            self.expected.remove_record(record)
+
+    def test_get_records_between_dates(self):
+        records = self.lst.get_records_between_dates('2023-09-05', '2023-09-20')
+        expected = self.expected.get_records_between_dates('2023-09-05', '2023-09-20')
+        self.assertEqual([(x.record_id, x.title, x.text, x.mood, x.symptoms, x.date) for x in records],
+                         [(x.record_id, x.title, x.text, x.mood, x.symptoms, x.date) for x in expected])
+
+    def test_iter_records(self):
+        records = list(self.lst.iter_records('2023-09-05', '2023-09-20'))
+        after = list(self.lst.iter_records('2023-09-05', '2023-09-20', after=records[3]))
+        expected = list(self.expected.iter_records('2023-09-05', '2023-09-20'))
+        self.assertEqual([x.record_id for x in records], [x.record_id for x in expected])
+        self.assertEqual([x.record_id for x in after], [x.record_id for x in expected[4:]])
+
+    def test_summarize(self):
+        summary = self.lst.summarize('2023-09-05', '2023-09-20')
+        expected = self.expected.summarize('2023-09-05', '2023-09-20')
+        self.assertEqual((summary.entries_number, summary.average_mood, summary.symptoms),
+                         (expected.entries_number, expected.average_mood, expected.symptoms))
+
+    def test_get_records_with_symptom(self):
+        records = self.lst.get_records_with_symptom('fever')
+        self.assertEqual([x.record_id for x in records],
+                         [x.record_id for x in self.expected.get_records_with_symptom('fever', '0001-01-01', '9999-12-31')])
+
+    def test_text_index_is_built_by_search(self):
+        self.assertIsNone(self.lst.text_index)
+        self.lst.search('text')
+        self.assertIsNotNone(self.lst.text_index)
+        record = self.lst.search('ü1')[0]
+        self.lst.remove_record(record)
+        self.assertNotIn(record.record_id, [x.record_id for x in self.lst.search('ü1')])
+
+    def test_search(self):
+        records = self.lst.search('ü1', '2023-09-05', '2023-09-20')
+        expected = self.expected.search('ü1', '2023-09-05', '2023-09-20')
+        self.assertEqual([(x.record_id, x.text) for x in records], [(x.record_id, x.text) for x in expected])
+        self.assertGreater(len(records), 0)
+
+    def test_add_records_to_stored_records(self):
+        records = [('new%s' % x, 'text', 5, 'pain', '2023-09-%02d' % (30 - x)) for x in range(5)]
+        self.lst.add_records(records)
+        self.expected.add_records(records)
+        self.assertEqual([x.record_id for x in self.lst.get_records_between_dates('2023-09-01', '2023-09-30')],
+                         [x.record_id for x in self.expected.get_records_between_dates('2023-09-01', '2023-09-30')])
+
+    def test_remove_record_not_stored(self):
+        count = self.lst.count_between_dates()
+        self.lst.remove_record(Record(1000, 'record', 'text', 6, 'pain', '2023-09-21'))
+        self.assertEqual(self.lst.count_between_dates(), count)
+
+
+class TestRecordEvents(unittest.TestCase):
+    def test_events(self):
+        lst = RecordList()
+        events = []
+        calls = []
+        lst.add_subscriber(events.append, events=True)
+        lst.add_subscriber(lambda: calls.append(1))
+        lst.add_record('record1', 'text', 6, 'pain', '2023-09-21')
+        lst.add_records([('record2', 'text', 6, 'pain', '2023-09-22'), ('record3', 'text', 6, 'pain', '2023-09-23')])
+        lst.remove_record(lst.Records[0])
+        self.assertEqual([event.kind for event in events], [RecordEvent.ADDED, RecordEvent.ADDED, RecordEvent.REMOVED])
+        self.assertEqual([[record.title for record in event.records] for event in events],
+                         [['record1'], ['record2', 'record3'], ['record1']])
+        self.assertEqual(len(calls), 3)
+
+    def test_remove_event_subscriber(self):
+        lst = RecordList()
+        events = []
+        lst.add_subscriber(events.append, events=True)
+        lst.remove_subscriber(events.append)
+        lst.add_record('record1', 'text', 6, 'pain', '2023-09-21')
+        self.assertEqual(events, [])
+
+    def test_iter_records_while_adding(self):
+        lst = RecordList()
+        lst.add_records(('record%s' % x, 'text', 6, 'pain', '2023-09-%02d' % (x + 1)) for x in range(10))
+        iterator = lst.iter_records(page_size=3)
+        first = [next(iterator) for x in range(3)]
+        lst.add_record('new', 'text', 6, 'pain', '2023-09-30')
+        rest = list(iterator)
+        self.assertEqual([record.title for record in first + rest], ['record%s' % x for x in range(9, -1, -1)])
 
 
 if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    unittest.main()
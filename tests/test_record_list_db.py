@@ -0,0 +1,553 @@
+import asyncio
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from DiaryRecords import (RecordList, ColumnarRecordList, RecordListDB, AsyncRecordListDB, RecordEvent, RecordCache,
+                          MIGRATIONS, PROFILES, day_ordinal)
+
+
+class RecordListDBTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.database_path = os.path.join(self.directory.name, 'records.db')
+        self.lst = RecordListDB(self.database_path)
+
+    def tearDown(self):
+        self.lst.close()
+        self.directory.cleanup()
+
+
+class TestConnection(RecordListDBTestCase):
+    def test_connection_is_reused(self):
+        with self.lst.connection() as db:
+            pass
+        with self.lst.connection() as other:
+            self.assertIs(db, other)
+
+    def test_nested_blocks_get_same_connection(self):
+        with self.lst.connection() as db, self.lst.connection() as other:
+            self.assertIs(db, other)
+
+    def test_threads_share_pool(self):
+        self.lst.add_record('record', 'text', 6, 'pain', '2023-09-21')
+        threads = [threading.Thread(target=self.lst.get_records) for _ in range(50)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertLessEqual(len(self.lst.connections), self.lst.pool_size)
+        self.assertEqual(len(self.lst.idle_connections), len(self.lst.connections))
+
+    def test_close(self):
+        self.lst.close()
+        with self.assertRaises(sqlite3.ProgrammingError):
+            self.lst.get_records()
+
+    def test_context_manager(self):
+        with RecordListDB(self.database_path) as lst:
+            lst.add_record('record', 'text', 6, 'pain', '2023-09-21')
+        self.assertTrue(lst.closed)
+        self.assertEqual(len(self.lst.get_records()), 1)
+
+
+class TestProfiles(RecordListDBTestCase):
+    def test_default_profile(self):
+        settings = self.lst.settings()
+        self.assertEqual(settings['journal_mode'], 'wal')
+        self.assertEqual(settings['synchronous'], 2)
+        self.assertEqual(settings['cache_size'], PROFILES['safe']['cache_size'])
+        self.assertEqual(settings['mmap_size'], 0)
+
+    def test_profile_is_applied_to_every_connection(self):
+        self.lst.close()
+        self.lst = RecordListDB(self.database_path, profile='balanced')
+        settings = []
+        thread = threading.Thread(target=lambda: settings.append(self.lst.settings()))
+        thread.start()
+        thread.join()
+        self.assertEqual(settings[0]['synchronous'], 1)
+        self.assertEqual(settings[0]['temp_store'], 2)
+        self.assertEqual(settings[0], self.lst.settings())
+
+    def test_unknown_profile(self):
+        with self.assertRaises(ValueError):
+            RecordListDB(self.database_path, profile='fastest')
+
+    def test_read_during_write(self):
+        self.lst.add_record('record', 'text', 6, 'pain', '2023-09-21')
+        records = []
+        with self.lst.connection() as writer:
+            writer.execute('BEGIN EXCLUSIVE')
+            writer.execute("INSERT INTO entries(title) VALUES('uncommitted')")
+            thread = threading.Thread(target=lambda: records.extend(self.lst.get_records()))
+            thread.start()
+            thread.join()
+            writer.rollback()
+        self.assertEqual([record.title for record in records], ['record'])
+
+
+class TestInMemoryDatabase(unittest.TestCase):
+    def test_threads_share_database(self):
+        with RecordListDB(':memory:') as lst:
+            thread = threading.Thread(target=lambda: lst.add_record('record', 'text', 6, 'pain', '2023-09-21'))
+            thread.start()
+            thread.join()
+            self.assertEqual(len(lst.get_records()), 1)
+
+    def test_write_behind(self):
+        with RecordListDB(':memory:', write_behind=True) as lst:
+            lst.add_record('record', 'text', 6, 'pain', '2023-09-21')
+            lst.flush()
+            self.assertEqual(len(lst.get_records()), 1)
+
+    def test_read_while_other_thread_writes(self):
+        with RecordListDB(':memory:', write_behind=True) as lst:
+            def write():
+                for x in range(300):
+                    lst.add_record('record%s' % x, 'text', 6, 'pain', '2023-09-21')
+            thread = threading.Thread(target=write)
+            thread.start()
+            for _ in range(300):
+                lst.get_records()
+                lst.summarize('2023-09-21', '2023-09-21')
+            thread.join()
+            lst.flush()
+            self.assertEqual(lst.count_between_dates(), 300)
+
+    def test_instances_have_own_databases(self):
+        with RecordListDB(':memory:') as lst, RecordListDB(':memory:') as other:
+            lst.add_record('record', 'text', 6, 'pain', '2023-09-21')
+            self.assertEqual(other.get_records(), [])
+
+
+class TestMigrate(RecordListDBTestCase):
+    def test_new_database_has_latest_version(self):
+        self.assertEqual(self.lst.schema_version(), max(MIGRATIONS))
+
+    def test_upgrade_existing_database(self):
+        path = os.path.join(self.directory.name, 'old.db')
+        db = sqlite3.connect(path)
+        db.execute('CREATE TABLE entries(title TEXT, text TEXT, mood INT, symptoms TEXT, date TEXT)')
+        db.execute("INSERT INTO entries VALUES('record', 'text', 6, 'pain', '2023-09-21')")
+        db.commit()
+        db.close()
+        with RecordListDB(path) as lst:
+            self.assertEqual(lst.schema_version(), max(MIGRATIONS))
+            with lst.connection() as db:
+                day = db.execute('SELECT day FROM entries').fetchone()[0]
+            self.assertEqual(day, day_ordinal('2023-09-21'))
+            self.assertEqual(len(lst.get_records_between_dates('2023-09-21', '2023-09-21')), 1)
+
+    def test_upgrade_dates_without_zero_padding(self):
+        path = os.path.join(self.directory.name, 'old.db')
+        db = sqlite3.connect(path)
+        db.execute('CREATE TABLE entries(title TEXT, text TEXT, mood INT, symptoms TEXT, date TEXT)')
+        db.execute("INSERT INTO entries VALUES('record1', 'text', 6, 'pain', '2023-09-05')")
+        db.execute("INSERT INTO entries VALUES('record2', 'text', 4, 'pain', '2023-9-5')")
+        db.commit()
+        db.close()
+        with RecordListDB(path) as lst:
+            self.assertEqual(len(list(lst.iter_records())), 2)
+            summary = lst.summarize('2023-09-05', '2023-09-05')
+            self.assertEqual(summary.entries_number, 2)
+            self.assertEqual(summary.symptoms, {'pain': 2})
+
+    def test_days_missing_after_earlier_upgrade_are_set(self):
+        self.lst.add_records([('record1', 'text', 6, 'pain', '2023-09-05'), ('record2', 'text', 4, 'pain', '2023-9-5')])
+        with self.lst.connection() as db, db:
+            # migration 2 of earlier versions left the days of dates without zero padding empty
+            db.execute("UPDATE entries SET day = NULL WHERE date = '2023-9-5'")
+            db.execute('UPDATE entry_symptoms SET day = NULL WHERE entry_id = 2')
+            db.execute('UPDATE daily_rollup SET entries_number = 1, mood_sum = 6')
+            db.execute('UPDATE daily_symptom_rollup SET number = 1')
+            db.execute('UPDATE schema_version SET version = 6')
+        self.lst.migrate()
+        summary = self.lst.summarize('2023-09-05', '2023-09-05')
+        self.assertEqual((summary.entries_number, summary.average_mood, summary.symptoms), (2, 5.0, {'pain': 2}))
+
+    def test_range_query_uses_index(self):
+        with self.lst.connection() as db:
+            plan = db.execute('EXPLAIN QUERY PLAN SELECT rowid FROM entries WHERE day BETWEEN 1 AND 2').fetchall()
+        self.assertIn('entries_day', plan[0][3])
+
+
+class TestAddRecord(RecordListDBTestCase):
+    def test_add_record(self):
+        self.lst.add_record('record', 'text', 6, 'pain', '2023-09-21')
+        records = self.lst.get_records()
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0].title, 'record')
+        self.assertEqual(records[0].date, '2023-09-21')
+        self.assertEqual(records[0].day, day_ordinal('2023-09-21'))
+
+
+class TestAddRecords(RecordListDBTestCase):
+    def test_add_records(self):
+        notifications = []
+        self.lst.add_subscriber(lambda: notifications.append(1))
+        self.lst.add_records(('record%s' % x, 'text', 6, 'pain', '2023-09-2%s' % x) for x in range(3))
+        records = self.lst.get_records()
+        self.assertEqual([record.title for record in records], ['record0', 'record1', 'record2'])
+        self.assertEqual(len(notifications), 1)
+
+    def test_large_import_sends_no_records(self):
+        events = []
+        self.lst.add_subscriber(events.append, events=True)
+        self.lst.max_event_records = 2
+        self.lst.link_chunk_size = 2
+        self.lst.add_records(('record%s' % x, 'text', 6, 'pain,cough', '2023-09-2%s' % x) for x in range(5))
+        self.assertEqual(events, [None])
+        self.assertEqual(self.lst.symptom_counts(), {'cough': 5, 'pain': 5})
+
+    def test_add_no_records(self):
+        notifications = []
+        self.lst.add_subscriber(lambda: notifications.append(1))
+        self.lst.add_records([])
+        self.assertEqual(notifications, [])
+
+
+class TestWriteBehind(RecordListDBTestCase):
+    def setUp(self):
+        super().setUp()
+        self.lst.close()
+        self.lst = RecordListDB(self.database_path, write_behind=True, batch_size=10, flush_interval=5)
+
+    def test_flush(self):
+        for x in range(3):
+            self.lst.add_record('record%s' % x, 'text', 6, 'pain', '2023-09-21')
+        self.lst.flush()
+        self.assertEqual([record.title for record in self.lst.get_records()], ['record0', 'record1', 'record2'])
+
+    def test_batches_are_bounded_by_size(self):
+        events = []
+        self.lst.add_subscriber(events.append, events=True)
+        for x in range(25):
+            self.lst.add_record('record%s' % x, 'text', 6, 'pain', '2023-09-21')
+        self.lst.flush()
+        self.assertEqual([len(event.records) for event in events], [10, 10, 5])
+
+    def test_subscribers_are_notified_after_commit(self):
+        committed = []
+        other = sqlite3.connect(self.database_path, check_same_thread=False)
+        self.lst.add_subscriber(
+            lambda: committed.append(other.execute('SELECT COUNT(*) FROM entries').fetchone()[0]))
+        self.lst.add_record('record', 'text', 6, 'pain', '2023-09-21')
+        self.lst.flush()
+        other.close()
+        self.assertEqual(committed, [1])
+
+    def test_close_writes_queued_records(self):
+        self.lst.add_record('record', 'text', 6, 'pain', '2023-09-21')
+        self.lst.close()
+        with RecordListDB(self.database_path) as lst:
+            self.assertEqual(len(lst.get_records()), 1)
+
+    def test_add_records_keeps_order(self):
+        self.lst.add_record('record0', 'text', 6, 'pain', '2023-09-21')
+        self.lst.add_records([('record1', 'text', 6, 'pain', '2023-09-21')])
+        self.assertEqual([record.title for record in self.lst.get_records()], ['record0', 'record1'])
+
+    def test_close_raises_write_error(self):
+        with self.lst.connection() as db:
+            db.execute('DROP TABLE daily_rollup')
+        self.lst.add_record('record', 'text', 6, 'pain', '2023-09-21')
+        with self.assertRaises(sqlite3.OperationalError):
+            self.lst.close()
+        self.assertTrue(self.lst.closed)
+
+    def test_flush_raises_write_error(self):
+        with self.lst.connection() as db:
+            db.execute('DROP TABLE daily_rollup')
+        self.lst.add_record('record', 'text', 6, 'pain', '2023-09-21')
+        with self.assertRaises(sqlite3.OperationalError):
+            self.lst.flush()
+
+
+class TestRemoveRecord(RecordListDBTestCase):
+    def test_remove_record(self):
+        self.lst.add_record('record', 'text', 6, 'pain', '2023-09-21')
+        self.lst.remove_record(self.lst.get_records()[0])
+        self.assertEqual(self.lst.get_records(), [])
+
+
+class TestGetRecordsBetweenDates(RecordListDBTestCase):
+    def test_get_records_between_dates(self):
+        for day in range(21, 25):
+            self.lst.add_record('record', 'text', 6, 'pain', '2023-09-%s' % day)
+        records = self.lst.get_records_between_dates('2023-09-22', '2023-09-24')
+        self.assertEqual([record.date for record in records], ['2023-09-22', '2023-09-23', '2023-09-24'])
+
+
+class TestIterRecords(RecordListDBTestCase):
+    def test_iter_records_pages(self):
+        self.lst.add_records(('record%s' % x, 'text', 6, 'pain', '2023-09-%02d' % (x % 5 + 1)) for x in range(20))
+        expected = sorted(self.lst.get_records(), key=lambda x: (x.date, x.record_id), reverse=True)
+        records = list(self.lst.iter_records(page_size=3))
+        self.assertEqual([record.record_id for record in records], [record.record_id for record in expected])
+
+    def test_iter_records_between_dates_after(self):
+        self.lst.add_records(('record%s' % x, 'text', 6, 'pain', '2023-09-%02d' % (x % 5 + 1)) for x in range(20))
+        records = list(self.lst.iter_records('2023-09-02', '2023-09-04', page_size=4))
+        self.assertEqual(len(records), 12)
+        self.assertEqual(records[0].date, '2023-09-04')
+        rest = list(self.lst.iter_records('2023-09-02', '2023-09-04', page_size=4, after=records[4]))
+        self.assertEqual([record.record_id for record in rest], [record.record_id for record in records[5:]])
+
+    def test_iter_records_uses_index(self):
+        with self.lst.connection() as db:
+            plan = db.execute('EXPLAIN QUERY PLAN SELECT rowid FROM entries '
+                              'WHERE day BETWEEN 1 AND 9 AND (day, rowid) < (5, 5) '
+                              'ORDER BY day DESC, rowid DESC LIMIT 3').fetchall()
+        self.assertEqual(len(plan), 1)
+        self.assertIn('entries_day', plan[0][3])
+
+
+class TestSummarize(RecordListDBTestCase):
+    def test_summarize(self):
+        self.lst.add_record('record1', 'text', 6, 'pain,cough', '2023-09-21')
+        self.lst.add_record('record2', 'text', 3, 'pain', '2023-09-22')
+        self.lst.add_record('record3', 'text', 9, '', '2023-09-23')
+        summary = self.lst.summarize('2023-09-21', '2023-09-22')
+        self.assertEqual(summary.entries_number, 2)
+        self.assertEqual(summary.average_mood, 4.5)
+        self.assertEqual(summary.symptoms, {'pain': 2, 'cough': 1})
+        summary = self.lst.summarize()
+        self.assertEqual(summary.entries_number, 3)
+        self.assertEqual(summary.average_mood, 6)
+
+    def test_summarize_no_records(self):
+        summary = self.lst.summarize()
+        self.assertEqual((summary.entries_number, summary.average_mood, summary.symptoms), (0, 0, {}))
+
+
+class TestSymptomCountsOfStores(RecordListDBTestCase):
+    def test_stores_count_symptoms_the_same(self):
+        records = [('record1', 'text', 6, 'pain,pain,cough', '2023-09-21'),
+                   ('record2', 'text', 3, 'fever,cough', '2023-09-22'),
+                   ('record3', 'text', 5, 'pain', '2023-09-22')]
+        expected = {'cough': 2, 'pain': 2, 'fever': 1}
+        for lst in (self.lst, RecordList(), ColumnarRecordList()):
+            lst.add_records(records)
+            self.assertEqual(list(lst.symptom_counts().items()), list(expected.items()))
+            self.assertEqual(lst.summarize('2023-09-21', '2023-09-21').symptoms, {'cough': 1, 'pain': 1})
+
+
+class TestSymptoms(RecordListDBTestCase):
+    def setUp(self):
+        super().setUp()
+        self.lst.add_record('record1', 'text', 6, 'pain,cough', '2023-09-21')
+        self.lst.add_records([('record2', 'text', 3, 'pain', '2023-09-22'),
+                              ('record3', 'text', 9, '', '2023-09-23'),
+                              ('record4', 'text', 5, 'cough,pain,fever', '2023-09-24')])
+
+    def test_symptom_counts(self):
+        self.assertEqual(self.lst.symptom_counts(), {'pain': 3, 'cough': 2, 'fever': 1})
+        self.assertEqual(self.lst.symptom_counts('2023-09-22', '2023-09-24'), {'pain': 2, 'cough': 1, 'fever': 1})
+
+    def test_get_records_with_symptom(self):
+        records = self.lst.get_records_with_symptom('cough')
+        self.assertEqual([record.title for record in records], ['record1', 'record4'])
+        records = self.lst.get_records_with_symptom('pain', '2023-09-22', '2023-09-23')
+        self.assertEqual([record.title for record in records], ['record2'])
+
+    def test_remove_record_unlinks_symptoms(self):
+        self.lst.remove_record(self.lst.get_records_with_symptom('fever')[0])
+        self.assertEqual(self.lst.symptom_counts(), {'pain': 2, 'cough': 1})
+
+    def test_migrate_symptoms_of_existing_database(self):
+        path = os.path.join(self.directory.name, 'old.db')
+        db = sqlite3.connect(path)
+        db.execute('CREATE TABLE entries(title TEXT, text TEXT, mood INT, symptoms TEXT, date TEXT)')
+        db.execute("INSERT INTO entries VALUES('record', 'text', 6, 'pain,cough', '2023-09-21')")
+        db.commit()
+        db.close()
+        with RecordListDB(path) as lst:
+            self.assertEqual(lst.symptom_counts('2023-09-21', '2023-09-21'), {'cough': 1, 'pain': 1})
+
+
+class TestSearch(RecordListDBTestCase):
+    def setUp(self):
+        super().setUp()
+        self.lst.add_record('Headache', 'Bad headache after work', 4, '', '2023-09-21')
+        self.lst.add_record('Walk', 'Long walk, no headache', 8, '', '2023-09-22')
+        self.lst.add_record('Work', 'Busy day at work', 6, '', '2023-09-23')
+
+    def test_search_ranks_records(self):
+        self.assertEqual([record.title for record in self.lst.search('headache')], ['Headache', 'Walk'])
+
+    def test_search_all_words_and_prefix(self):
+        self.assertEqual([record.title for record in self.lst.search('WORK head')], ['Headache'])
+
+    def test_search_between_dates(self):
+        records = self.lst.search('headache', '2023-09-22', '2023-09-23')
+        self.assertEqual([record.title for record in records], ['Walk'])
+
+    def test_query_syntax_is_escaped(self):
+        self.assertEqual(self.lst.search('"busy" OR NOT'), [])
+        self.assertEqual(self.lst.search('*'), [])
+
+    def test_index_follows_removed_records(self):
+        self.lst.remove_record(self.lst.search('busy')[0])
+        self.assertEqual(self.lst.search('busy'), [])
+
+    def test_index_of_upgraded_database(self):
+        with self.lst.connection() as db, db:
+            for trigger in ('entries_insert_fts', 'entries_delete_fts', 'entries_update_fts'):
+                db.execute('DROP TRIGGER %s' % trigger)
+            db.execute('DROP TABLE entries_fts')
+            db.execute('DROP TABLE symptom_catalog')
+            db.execute('UPDATE schema_version SET version = 4')
+        self.lst.migrate()
+        self.assertEqual(len(self.lst.search('headache')), 2)
+
+
+class TestSymptomCatalog(RecordListDBTestCase):
+    def test_default_symptoms(self):
+        self.assertEqual(self.lst.search_symptoms('headache'), ['Headache'])
+
+    def test_added_terms_are_persisted(self):
+        self.lst.add_symptom_terms(['Jaw pain', 'headache', ' '])
+        self.assertEqual(self.lst.search_symptoms('jaw'), ['Jaw pain'])
+        with RecordListDB(self.database_path) as lst:
+            self.assertEqual(lst.search_symptoms('jaw'), ['Jaw pain'])
+            self.assertEqual(lst.search_symptoms('headache'), ['Headache'])
+            with lst.connection() as db:
+                rows = db.execute('SELECT name FROM symptom_catalog WHERE user_defined = 1').fetchall()
+        self.assertEqual(rows, [('Jaw pain',)])
+
+    def test_catalog_is_read_when_store_is_opened(self):
+        self.lst.catalog_loader.join()
+        self.assertIn('Headache', self.lst.catalog)
+
+
+class TestDailyRollup(RecordListDBTestCase):
+    def test_rollup_follows_writes(self):
+        self.lst.add_records(('record%s' % x, 'text', x % 10 + 1, 'pain,cough' if x % 3 else 'fever',
+                              '2023-09-%02d' % (x % 7 + 1)) for x in range(40))
+        for record in self.lst.get_records()[::4]:
+            self.lst.remove_record(record)
+        records = self.lst.get_records_between_dates('2023-09-02', '2023-09-05')
+        summary = self.lst.summarize('2023-09-02', '2023-09-05')
+        self.assertEqual(summary.entries_number, len(records))
+        self.assertEqual(summary.average_mood, round(sum(record.mood for record in records) / len(records), 1))
+        expected = {}
+        for record in records:
+            for symptom in record.symptoms.split(','):
+                expected[symptom] = expected.get(symptom, 0) + 1
+        self.assertEqual(summary.symptoms, expected)
+
+    def test_statistics_between_dates(self):
+        self.lst.add_records([('record1', 'text', 4, '', '2023-09-21'),
+                              ('record2', 'text', 8, '', '2023-09-22'),
+                              ('record3', 'text', 5, '', '2023-09-23')])
+        self.assertEqual(self.lst.count_between_dates('2023-09-22', '2023-09-30'), 2)
+        self.assertEqual(self.lst.average_mood_between_dates('2023-09-21', '2023-09-22'), 6)
+
+    def test_get_daily_statistics(self):
+        self.lst.add_records([('record1', 'text', 4, '', '2023-09-21'),
+                              ('record2', 'text', 8, '', '2023-09-21'),
+                              ('record3', 'text', 5, '', '2023-09-23')])
+        self.lst.remove_record(self.lst.get_records()[1])
+        self.assertEqual(self.lst.get_daily_statistics('2023-09-01', '2023-09-30'),
+                         [('2023-09-21', 1, 4, 4, 4), ('2023-09-23', 1, 5, 5, 5)])
+
+    def test_migrate_rollup_of_existing_database(self):
+        path = os.path.join(self.directory.name, 'old.db')
+        db = sqlite3.connect(path)
+        db.execute('CREATE TABLE entries(title TEXT, text TEXT, mood INT, symptoms TEXT, date TEXT)')
+        db.execute("INSERT INTO entries VALUES('record', 'text', 6, 'pain', '2023-09-21')")
+        db.execute("INSERT INTO entries VALUES('record', 'text', 3, 'pain', '2023-09-21')")
+        db.commit()
+        db.close()
+        with RecordListDB(path) as lst:
+            summary = lst.summarize()
+            self.assertEqual((summary.entries_number, summary.average_mood, summary.symptoms), (2, 4.5, {'pain': 2}))
+
+
+class TestRecordEvents(RecordListDBTestCase):
+    def test_events(self):
+        events = []
+        self.lst.add_subscriber(events.append, events=True)
+        self.lst.add_record('record1', 'text', 6, 'pain', '2023-09-21')
+        self.lst.add_records([('record2', 'text', 6, 'pain', '2023-09-22'), ('record3', 'text', 6, '', '2023-09-23')])
+        self.lst.remove_record(events[0].records[0])
+        self.assertEqual([event.kind for event in events], [RecordEvent.ADDED, RecordEvent.ADDED, RecordEvent.REMOVED])
+        self.assertEqual([record.record_id for record in events[1].records], [2, 3])
+        self.assertEqual(events[0].records[0].day, day_ordinal('2023-09-21'))
+        self.assertEqual([record.title for record in self.lst.get_records()], ['record2', 'record3'])
+
+
+class TestRecordCache(RecordListDBTestCase):
+    def test_cache(self):
+        self.lst.add_records(('record%s' % x, 'text', 6, 'pain', '2023-09-%02d' % (x + 1)) for x in range(10))
+        cache = RecordCache(self.lst)
+        self.assertEqual(cache.summarize('2023-09-01', '2023-09-05').entries_number, 5)
+        self.assertEqual(len(list(cache.iter_records(page_size=4))), 10)
+        misses = cache.misses
+        # a closed store raises an error on any query, so cached results must not touch the database
+        self.lst.closed = True
+        self.assertEqual(cache.summarize('2023-09-01', '2023-09-05').entries_number, 5)
+        self.assertEqual(len(list(cache.iter_records(page_size=4))), 10)
+        self.lst.closed = False
+        self.assertEqual(cache.misses, misses)
+        self.assertEqual(cache.hits, 4)
+
+    def test_cache_invalidation(self):
+        cache = RecordCache(self.lst)
+        self.assertEqual(cache.summarize().entries_number, 0)
+        self.lst.add_record('record', 'text', 6, 'pain', '2023-09-21')
+        self.assertEqual(cache.summarize().entries_number, 1)
+        self.assertEqual((cache.hits, cache.misses), (0, 2))
+
+    def test_cache_size(self):
+        cache = RecordCache(self.lst, max_size=2)
+        for day in range(1, 4):
+            cache.get_records_between_dates('2023-09-01', '2023-09-%02d' % day)
+        self.assertEqual(len(cache.results), 2)
+        self.assertNotIn(('records', '2023-09-01', '2023-09-01'), cache.results)
+
+
+class TestAsyncRecordListDB(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.lst = AsyncRecordListDB(os.path.join(self.directory.name, 'records.db'))
+
+    async def asyncTearDown(self):
+        await self.lst.close()
+        self.directory.cleanup()
+
+    async def test_add_and_iterate(self):
+        await self.lst.add_records(('record%s' % x, 'text', 6, 'pain', '2023-09-%02d' % (x + 1)) for x in range(5))
+        await self.lst.add_record('record5', 'text', 3, 'cough', '2023-09-30')
+        titles = [record.title async for record in self.lst.iter_records(page_size=2)]
+        self.assertEqual(titles, ['record5', 'record4', 'record3', 'record2', 'record1', 'record0'])
+        summary = await self.lst.summarize('2023-09-01', '2023-09-30')
+        self.assertEqual(summary.entries_number, 6)
+
+    async def test_open(self):
+        async with await AsyncRecordListDB.open(os.path.join(self.directory.name, 'other.db')) as lst:
+            await lst.add_record('record', 'text', 6, 'pain', '2023-09-21')
+            self.assertEqual(len(await lst.get_records()), 1)
+
+    async def test_queries_run_on_executor_thread(self):
+        thread_names = await self.lst.run(lambda: threading.current_thread().name)
+        self.assertTrue(thread_names.startswith('RecordListDB'))
+
+    async def test_coroutine_subscriber(self):
+        events = asyncio.Queue()
+
+        async def record_list_updated(event):
+            await events.put(event)
+
+        self.lst.add_subscriber(record_list_updated, events=True)
+        await self.lst.add_record('record', 'text', 6, 'pain', '2023-09-21')
+        event = await asyncio.wait_for(events.get(), 5)
+        self.assertEqual(event.kind, RecordEvent.ADDED)
+        self.lst.remove_subscriber(record_list_updated)
+        self.assertEqual(self.lst.record_list.subscribers, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import importlib.util
+import unittest
+from DiaryRecords import AsyncRecordListDB
+
+FLET_INSTALLED = importlib.util.find_spec('flet') is not None
+
+
+# AsyncPage class stands for the page of Flet's async mode, which can only be updated asynchronously
+class AsyncPage:
+    def __init__(self):
+        self.updated = []
+
+    def update(self, *controls):
+        raise NotImplementedError('sync update() of a page in the async mode')
+
+    async def update_async(self, *controls):
+        self.updated.append(controls)
+
+
+@unittest.skipUnless(FLET_INSTALLED, 'flet is not installed')
+class TestAsyncViewModel(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        from ViewModel import ViewModel
+        self.lst = AsyncRecordListDB(':memory:')
+        await self.lst.add_records(('record%s' % x, 'text', x % 10 + 1, 'pain', '2023-09-%02d' % (x % 28 + 1))
+                                   for x in range(75))
+        self.model = ViewModel(self.lst, record_list_view=True)
+        self.view = self.model.record_list_view
+
+    async def asyncTearDown(self):
+        await self.lst.close()
+
+    async def test_pages_are_awaited_while_scrolling(self):
+        await self.model.update_record_list_view_async()
+        first_window = self.view.window_size + self.view.page_size
+        self.view.load_records(first_window)
+        self.assertEqual(len(self.view.records), first_window)
+        self.assertIsNotNone(self.view.next_page)
+        await self.view.load_records_async(first_window + self.view.page_size)
+        await self.view.load_records_async(100)
+        self.assertIsNone(self.view.next_page)
+        records = sorted(await self.lst.get_records(), key=lambda record: (record.day, record.record_id), reverse=True)
+        self.assertEqual([record.record_id for record in self.view.records],
+                         [record.record_id for record in records])
+
+    async def test_search_has_no_next_page(self):
+        self.model.search_query = 'record7'
+        await self.model.update_record_list_view_async()
+        self.assertIsNone(self.view.next_page)
+
+    async def test_search_of_mounted_view(self):
+        page = AsyncPage()
+        self.view.build()
+        self.model.page = self.view.page = page
+        self.model.search_field.value = 'record42'
+        await self.model.search_submitted_async(None)
+        self.assertEqual(page.updated, [(self.model,)])
+        self.assertEqual([record.title for record in self.view.records], ['record42'])
+
+    async def test_delete_click_removes_record(self):
+        record = (await self.lst.get_records())[0]
+        record_view = self.view.create_record_view(record, {})
+        await record_view.on_delete_click_async(None)
+        self.assertNotIn(record.record_id, [record.record_id for record in await self.lst.get_records()])
+
+
+if __name__ == '__main__':
+    unittest.main()